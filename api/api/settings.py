@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'drf_spectacular',
@@ -47,6 +48,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,6 +92,31 @@ DATABASES = {
     }
 }
 
+# Read replicas of the primary, as comma separated hosts, sharing its
+# name and credentials. Safe requests read from a healthy replica
+# replaying with a lag under REPLICA_MAX_LAG seconds, checked every
+# REPLICA_CHECK_INTERVAL seconds; a client that wrote reads from the
+# primary for REPLICA_PIN_SECONDS.
+REPLICA_HOSTS = [
+    host.strip() for host in
+    os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host.strip()
+]
+REPLICA_DATABASES = [
+    f'replica{index}' for index in range(1, len(REPLICA_HOSTS) + 1)
+]
+for alias, host in zip(REPLICA_DATABASES, REPLICA_HOSTS):
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': {'connect_timeout': 2},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+REPLICA_CHECK_INTERVAL = int(os.environ.get('REPLICA_CHECK_INTERVAL', 10))
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -131,6 +159,56 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Product image uploads
+PRODUCT_IMAGE_MAX_UPLOAD_SIZE = int(
+    os.environ.get('PRODUCT_IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024))
+PRODUCT_IMAGE_MAX_DIMENSION = int(
+    os.environ.get('PRODUCT_IMAGE_MAX_DIMENSION', 8000))
+
+# Cache, a local memory, file based or Redis cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The catalog cache, the throttles and the login rate limits must be
+# shared by every worker: the local memory cache is refused when
+# WEB_CONCURRENCY runs more than one, see core.checks.
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Public catalog responses cache
+CATALOG_CACHE_ALIAS = 'default'
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 300))
+
+# Catalog changes younger than this many seconds are not synced yet, so
+# that transactions still in flight can commit.
+CATALOG_CHANGES_SETTLE_TIME = int(
+    os.environ.get('CATALOG_CHANGES_SETTLE_TIME', 10))
+
+# Response compression, brotli requires the brotli package.
+COMPRESSION_MIN_LENGTH = int(os.environ.get('COMPRESSION_MIN_LENGTH', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_LEVEL = int(os.environ.get('COMPRESSION_BROTLI_LEVEL', 5))
+COMPRESSION_EXCLUDED_TYPES = [
+    'image/',
+    'video/',
+    'audio/',
+    'font/woff',
+    'application/gzip',
+    'application/zip',
+    'application/x-brotli',
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -140,7 +218,21 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.MessagePackRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Proxies in front of the api, whose X-Forwarded-For entries are
+    # trusted to tell the client address of the throttles.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
 
@@ -151,6 +243,53 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=30),
     'ALGORITHM': 'HS256',
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'ROTATE_REFRESH_TOKENS': True,
 }
 
+# Bloom filter of the revoked refresh tokens: the tokens it holds before
+# it is rebuilt larger, its false positive rate, the seconds between
+# syncs with the revocations of the other processes, and the seconds of
+# revocations read again by each sync, for those committed late.
+REVOCATION_FILTER_CAPACITY = int(
+    os.environ.get('REVOCATION_FILTER_CAPACITY', 100000))
+REVOCATION_FILTER_ERROR_RATE = 0.001
+REVOCATION_FILTER_SYNC_INTERVAL = int(
+    os.environ.get('REVOCATION_FILTER_SYNC_INTERVAL', 5))
+REVOCATION_FILTER_SYNC_OVERLAP = int(
+    os.environ.get('REVOCATION_FILTER_SYNC_OVERLAP', 60))
+
 AUTH_USER_MODEL = 'core.User'
+
+# Password hashing. Passwords hashed by another hasher, or with another
+# Argon2 cost, are rehashed on login.
+PASSWORD_HASHERS = [
+    'core.hashing.TunableArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 65536))
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 2))
+
+# Passwords are hashed on a pool of this many threads, and refused past
+# PASSWORD_HASHING_QUEUE waiting hashings or PASSWORD_HASHING_TIMEOUT
+# seconds.
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 4))
+PASSWORD_HASHING_QUEUE = int(os.environ.get('PASSWORD_HASHING_QUEUE', 32))
+PASSWORD_HASHING_TIMEOUT = int(
+    os.environ.get('PASSWORD_HASHING_TIMEOUT', 10))
+
+# Token buckets of the login and signup throttles: the burst of requests
+# allowed, and the requests per second refilled.
+THROTTLE_BUCKETS = {
+    'auth_ip': (30, 0.5),
+    'auth_email': (10, 1 / 60),
+}
+
+# Seconds the responses stored under an Idempotency-Key are replayed,
+# expired keys are deleted by the clear_idempotency_keys command.
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+
+# Seconds the state of a user checked by the stateless JWT authentication
+# is cached in each process, revocations take up to this long to apply.
+JWT_USER_STATE_TTL = int(os.environ.get('JWT_USER_STATE_TTL', 60))
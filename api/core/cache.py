@@ -0,0 +1,90 @@
+"""
+Catalog response cache.
+
+Cached catalog entries are keyed on the catalog version, a counter
+bumped on every write to the catalog: a write makes every entry cached
+before it unreachable, and they expire on their own. A missing version,
+never set or evicted, is seeded from the clock in nanoseconds, so that
+it never goes back to a version whose entries may still be cached.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def catalog_cache():
+    """Returns the cache backend of the catalog."""
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def get_catalog_version():
+    """Returns the current catalog version."""
+    cache = catalog_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+
+    return version
+
+
+def bump_catalog_version():
+    """Invalidates the cached catalog entries.
+
+    The version is bumped right away and again once the current
+    transaction commits, so that entries rebuilt from the data read
+    before the commit are invalidated too.
+    """
+    _bump_catalog_version()
+    transaction.on_commit(_bump_catalog_version)
+
+
+def _bump_catalog_version():
+    cache = catalog_cache()
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def catalog_cache_key(path):
+    """Returns the cache key of a catalog path, query string included."""
+    digest = hashlib.sha1(path.encode()).hexdigest()
+
+    return f'catalog:{get_catalog_version()}:{digest}'
+
+
+def get_or_build(key, build, timeout=None, lock_timeout=10, wait=0.05):
+    """Returns the cached value of key, building it on a miss.
+
+    Only one caller rebuilds a missing entry, the others wait for it
+    up to lock_timeout seconds before building it themselves.
+    """
+    cache = catalog_cache()
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, timeout=lock_timeout):
+        try:
+            value = build()
+            cache.set(key, value, timeout=timeout)
+            return value
+        finally:
+            cache.delete(lock)
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(wait)
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+    return build()
@@ -0,0 +1,27 @@
+"""
+Project system checks.
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+@register()
+def check_shared_catalog_cache(app_configs, **kwargs):
+    """Refuses a process local catalog cache with several workers.
+
+    The catalog is invalidated by bumping a version in its cache, a
+    version kept in one process leaves the others serving stale pages.
+    """
+    cache = caches[settings.CATALOG_CACHE_ALIAS]
+    if settings.WEB_CONCURRENCY > 1 and isinstance(cache, LocMemCache):
+        return [Error(
+            'The catalog cache is local to each process, but '
+            f'WEB_CONCURRENCY runs {settings.WEB_CONCURRENCY} workers.',
+            hint='Set CACHE_BACKEND to redis and CACHE_LOCATION to the '
+                 'url of a shared Redis server.',
+            id='core.E001',
+        )]
+
+    return []
@@ -0,0 +1,99 @@
+"""
+Password hashing off the request thread.
+
+Passwords are hashed on a bounded pool of threads. The hashers release
+the GIL, so a burst of logins keeps at most PASSWORD_HASHING_WORKERS
+cores busy, and hashings past PASSWORD_HASHING_QUEUE waiting ones are
+refused instead of piling up behind them.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashingUnavailable(Exception):
+    """Raised when a password cannot be hashed in time."""
+
+
+class TunableArgon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2 hasher whose cost is read from the ARGON2_* settings.
+
+    Passwords hashed with another cost are rehashed on login.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class BoundedExecutor:
+    """Thread pool refusing tasks past a number of pending ones."""
+
+    def __init__(self, workers, queue):
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix='hashing',
+        )
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, func, *args, timeout=None):
+        """Returns func(*args), run on the pool."""
+        if not self.slots.acquire(blocking=False):
+            raise HashingUnavailable('Too many passwords are being hashed.')
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda future: self.slots.release())
+
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            raise HashingUnavailable('Hashing the password timed out.')
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Returns the hashing pool of the process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = BoundedExecutor(
+                settings.PASSWORD_HASHING_WORKERS,
+                settings.PASSWORD_HASHING_QUEUE,
+            )
+
+    return _executor
+
+
+def make_password(password):
+    """Returns the password hashed by the preferred hasher."""
+    return get_executor().run(
+        hashers.make_password, password,
+        timeout=settings.PASSWORD_HASHING_TIMEOUT,
+    )
+
+
+def check_password(password, encoded):
+    """Returns whether password matches, and whether to rehash it."""
+    rehash = []
+    is_correct = get_executor().run(
+        hashers.check_password, password, encoded, rehash.append,
+        timeout=settings.PASSWORD_HASHING_TIMEOUT,
+    )
+
+    return is_correct, bool(rehash)
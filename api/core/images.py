@@ -0,0 +1,162 @@
+"""
+Product image processing.
+"""
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from django.core.files.base import ContentFile, File
+
+from core.models import product_image_file_path
+
+
+IMAGE_SIZES = {
+    'thumbnail': (150, 150),
+    'medium': (600, 600),
+}
+
+IMAGE_FORMATS = {
+    'JPEG': {'ext': '.jpg', 'quality': 85},
+    'WEBP': {'ext': '.webp', 'quality': 80},
+}
+
+UPLOAD_IMAGE_FORMATS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'WEBP': '.webp',
+}
+
+UPLOAD_HEADER_SIZE = 256 * 1024
+
+PRODUCT_IMAGE_VARIANTS = {
+    'thumbnail': ('thumbnail', 'JPEG'),
+    'thumbnail_webp': ('thumbnail', 'WEBP'),
+    'medium': ('medium', 'JPEG'),
+    'medium_webp': ('medium', 'WEBP'),
+}
+
+
+def variant_file_path(name, variant):
+    """Returns the path of an image variant, next to the original."""
+    root = os.path.splitext(name)[0]
+    size, format = PRODUCT_IMAGE_VARIANTS[variant]
+
+    return f'{root}_{size}{IMAGE_FORMATS[format]["ext"]}'
+
+
+def encode_variant(image, size, format):
+    """Returns the image resized to fit size, encoded in format."""
+    variant = image.copy()
+    variant.thumbnail(IMAGE_SIZES[size], Image.LANCZOS)
+    if format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+
+    buffer = BytesIO()
+    variant.save(
+        buffer,
+        format=format,
+        quality=IMAGE_FORMATS[format]['quality'],
+        optimize=True,
+    )
+
+    return buffer.getvalue()
+
+
+def create_product_image_variants(product):
+    """Generates the resized variants of the product image.
+
+    The variants are stored next to the original and their names saved
+    on product.image_variants, unless the image was replaced meanwhile.
+    """
+    if not product.image:
+        return
+
+    storage = product.image.storage
+    with product.image.open('rb') as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+
+    variants = {}
+    for variant, (size, format) in PRODUCT_IMAGE_VARIANTS.items():
+        name = variant_file_path(product.image.name, variant)
+        if storage.exists(name):
+            storage.delete(name)
+        variants[variant] = storage.save(
+            name, ContentFile(encode_variant(image, size, format)))
+
+    type(product).objects.filter(
+        pk=product.pk,
+        image=product.image.name,
+    ).update(image_variants=variants)
+
+
+class InvalidImage(ValueError):
+    """Raised when an upload is not an accepted image."""
+
+
+class ImageTooLarge(InvalidImage):
+    """Raised when an upload exceeds the accepted size."""
+
+
+class LimitedStream:
+    """Reader of an already read head followed by the rest of a stream.
+
+    Raises ImageTooLarge as soon as more than max_size bytes are read.
+    """
+
+    def __init__(self, head, stream, max_size):
+        self.head = head
+        self.stream = stream
+        self.max_size = max_size
+        self.read_size = 0
+
+    def read(self, size=-1):
+        if self.head:
+            data, self.head = self.head, b''
+        else:
+            data = self.stream.read(size)
+        self.read_size += len(data)
+        if self.read_size > self.max_size:
+            raise ImageTooLarge(
+                f'The image is larger than {self.max_size} bytes.')
+
+        return data
+
+
+def read_image_header(head):
+    """Returns the format and size of an image from its first bytes.
+
+    Only the header is parsed, the pixels are not decoded.
+    """
+    try:
+        with Image.open(BytesIO(head)) as image:
+            return image.format, image.size
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise InvalidImage('The upload is not a valid image.')
+
+
+def save_product_image(product, stream, max_size, max_dimension):
+    """Streams an uploaded image to the storage of the product images.
+
+    The format and dimensions are checked from the header before the
+    body is written, chunk by chunk, and the size while it is written.
+    Returns the name of the stored image.
+    """
+    head = stream.read(UPLOAD_HEADER_SIZE)
+    format, (width, height) = read_image_header(head)
+    if format not in UPLOAD_IMAGE_FORMATS:
+        raise InvalidImage(f'Unsupported image format {format}.')
+    if max(width, height) > max_dimension:
+        raise InvalidImage(
+            f'The image is larger than {max_dimension} pixels.')
+
+    field = product._meta.get_field('image')
+    name = product_image_file_path(
+        product, f'image{UPLOAD_IMAGE_FORMATS[format]}')
+    try:
+        return field.storage.save(
+            name, File(LimitedStream(head, stream, max_size)))
+    except ImageTooLarge:
+        field.storage.delete(name)
+        raise
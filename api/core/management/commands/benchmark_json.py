@@ -0,0 +1,75 @@
+"""
+Benchmark JSON renderers command.
+"""
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the JSON renderers."""
+
+    help = 'Times the JSON encoding of product lists by each renderer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=10000,
+            help='Number of products per list.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed encodings, the best one is reported.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        count = options['count']
+        now = timezone.now()
+        payloads = {
+            # As output by the product serializers.
+            'serialized': [{
+                'id': i,
+                'title': f'Product {i}',
+                'price': '19.99',
+                'rating_avg': '4.25',
+                'rating_count': i % 100,
+            } for i in range(count)],
+            # Decimals and datetimes left to the encoder.
+            'native': [{
+                'id': i,
+                'title': f'Product {i}',
+                'price': Decimal('19.99'),
+                'rating_avg': Decimal('4.25'),
+                'rating_count': i % 100,
+                'updated_at': now,
+            } for i in range(count)],
+        }
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson is not installed, FastJSONRenderer falls back to '
+                'the stdlib.'))
+
+        for name, data in payloads.items():
+            expected = JSONRenderer().render(data)
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                if renderer.render(data) != expected:
+                    raise CommandError(
+                        f'{type(renderer).__name__} output differs.')
+                best = min(timeit.repeat(
+                    lambda: renderer.render(data),
+                    number=1,
+                    repeat=options['repeat'],
+                ))
+                self.stdout.write(
+                    f'{name:<10} {type(renderer).__name__:<18} '
+                    f'{best * 1000:8.2f} ms per {count} products')
@@ -0,0 +1,34 @@
+"""
+Clear idempotency keys command.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    """Django command to delete the expired idempotency keys."""
+
+    help = 'Deletes the idempotency keys older than IDEMPOTENCY_KEY_TTL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of keys deleted per statement.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        batch_size = options['batch_size']
+        deleted = 0
+        while True:
+            ids = list(IdempotencyKey.objects.expired().values_list(
+                'id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired idempotency keys.'))
@@ -0,0 +1,34 @@
+"""
+Clear token revocations command.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import TokenRevocation
+
+
+class Command(BaseCommand):
+    """Django command to delete the revocations of expired tokens."""
+
+    help = 'Deletes the revocations of the refresh tokens expired by now.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of revocations deleted per statement.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        batch_size = options['batch_size']
+        deleted = 0
+        while True:
+            ids = list(TokenRevocation.objects.expired().values_list(
+                'id', flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted += TokenRevocation.objects.filter(id__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired token revocations.'))
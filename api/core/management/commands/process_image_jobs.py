@@ -0,0 +1,31 @@
+"""
+Process product image jobs command.
+"""
+from core.images import create_product_image_variants
+from core.management.jobs import JobWorkerCommand
+from core.models import ProductImageJob
+
+
+class Command(JobWorkerCommand):
+    """Django command running the product image worker."""
+
+    help = 'Generates the resized variants of the queued product images.'
+    model = ProductImageJob
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(batch_size=10)
+
+    def process(self, jobs):
+        """Generates the variants of each image of a batch of jobs."""
+        jobs = ProductImageJob.objects.select_related('product').filter(
+            pk__in=[job.pk for job in jobs])
+        done = []
+        for job in jobs:
+            try:
+                create_product_image_variants(job.product)
+            except Exception as error:
+                self.retry([job], error)
+            else:
+                done.append(job)
+        self.complete(done)
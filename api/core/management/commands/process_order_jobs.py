@@ -0,0 +1,25 @@
+"""
+Process order jobs command.
+"""
+from django.db import transaction
+
+from core.management.jobs import JobWorkerCommand
+from core.models import Order, OrderJob
+
+
+class Command(JobWorkerCommand):
+    """Django command running the order processing worker."""
+
+    help = 'Processes the queued order jobs by batches.'
+    model = OrderJob
+
+    def process(self, jobs):
+        """Processes the orders of a batch of jobs in one statement."""
+        try:
+            with transaction.atomic():
+                Order.objects.filter(
+                    pk__in=[job.order_id for job in jobs]
+                ).process()
+                self.complete(jobs)
+        except Exception as error:
+            self.retry(jobs, error)
@@ -0,0 +1,37 @@
+"""
+Rebuild product ratings command.
+"""
+from django.db import transaction
+from django.db.models import Max
+from django.core.management.base import BaseCommand
+
+from core.models import Product
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the product rating aggregates."""
+
+    help = 'Recomputes the rating aggregates of products from reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of product ids updated per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        batch_size = options['batch_size']
+        last_id = Product.objects.aggregate(last=Max('id'))['last'] or 0
+        updated = 0
+        for start in range(0, last_id + 1, batch_size):
+            with transaction.atomic():
+                updated += Product.objects.filter(
+                    id__gte=start,
+                    id__lt=start + batch_size,
+                ).rebuild_ratings()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt ratings of {updated} products.'))
@@ -0,0 +1,37 @@
+"""
+Update order prices command.
+"""
+from django.db import transaction
+from django.db.models import Max
+from django.core.management.base import BaseCommand
+
+from core.models import Order
+
+
+class Command(BaseCommand):
+    """Django command to recompute order prices from their items."""
+
+    help = 'Sets the price of orders to the sum of their items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of order ids updated per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        batch_size = options['batch_size']
+        last_id = Order.objects.aggregate(last=Max('id'))['last'] or 0
+        updated = 0
+        for start in range(0, last_id + 1, batch_size):
+            with transaction.atomic():
+                updated += Order.objects.filter(
+                    id__gte=start,
+                    id__lt=start + batch_size,
+                ).update_price()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated the price of {updated} orders.'))
@@ -0,0 +1,128 @@
+"""
+Background job worker base command.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.db import connection
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class JobWorkerCommand(BaseCommand):
+    """Base of the commands running a background job worker.
+
+    Subclasses set the job model and implement process().
+    """
+    model = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Number of jobs claimed and processed at once.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of worker threads.',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Number of attempts before a job is marked failed.',
+        )
+        parser.add_argument(
+            '--backoff',
+            type=float,
+            default=2.0,
+            help='Seconds before the first retry, doubled on each retry.',
+        )
+        parser.add_argument(
+            '--lease',
+            type=float,
+            default=300.0,
+            help='Seconds after which a claimed job is due again.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the queue is empty.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Stop once the queue is empty instead of polling.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.options = options
+        self.stop = threading.Event()
+
+        if options['concurrency'] == 1:
+            self.work()
+        else:
+            workers = [
+                threading.Thread(target=self.work, daemon=True)
+                for i in range(options['concurrency'])
+            ]
+            for worker in workers:
+                worker.start()
+            try:
+                for worker in workers:
+                    worker.join()
+            except KeyboardInterrupt:
+                self.stop.set()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.model._meta.verbose_name_plural} processed.'.capitalize()
+        ))
+
+    def work(self):
+        """Claims and processes batches of jobs until stopped."""
+        lease = timedelta(seconds=self.options['lease'])
+        try:
+            while not self.stop.is_set():
+                jobs = self.model.objects.claim(
+                    self.options['batch_size'], lease=lease)
+                if jobs:
+                    self.process(jobs)
+                elif self.options['once']:
+                    break
+                else:
+                    time.sleep(self.options['poll_interval'])
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
+
+    def process(self, jobs):
+        """Processes a batch of claimed jobs."""
+        raise NotImplementedError
+
+    def complete(self, jobs):
+        """Marks the jobs done."""
+        self.model.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=self.model.Status.DONE,
+            last_error='',
+        )
+
+    def retry(self, jobs, error):
+        """Schedules the failed jobs again with an exponential backoff."""
+        now = timezone.now()
+        for job in jobs:
+            job.last_error = repr(error)
+            if job.attempts >= self.options['max_attempts']:
+                job.status = self.model.Status.FAILED
+            else:
+                job.status = self.model.Status.PENDING
+                delay = self.options['backoff'] * 2 ** (job.attempts - 1)
+                job.run_after = now + timedelta(seconds=delay)
+        self.model.objects.bulk_update(
+            jobs, ['status', 'run_after', 'last_error'])
+        self.stderr.write(f'Failed processing {len(jobs)} jobs: {error!r}')
@@ -0,0 +1,187 @@
+"""
+Response compression and replica pinning middleware.
+"""
+import zlib
+
+from core import routers
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def parse_accept_encoding(header):
+    """Returns the q-value of each coding of an Accept-Encoding header."""
+    codings = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        codings[coding] = quality
+
+    return codings
+
+
+class GzipCompressor:
+    """Gzip compressor."""
+    encoding = 'gzip'
+
+    def __init__(self, level):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        """Compresses data, flushed so that it can be sent right away."""
+        return self.compressor.compress(data) + self.compressor.flush(
+            zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliCompressor:
+    """Brotli compressor."""
+    encoding = 'br'
+
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        """Compresses data, flushed so that it can be sent right away."""
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compresses responses with brotli or gzip, as the client accepts.
+
+    Brotli is preferred when the brotli package is installed. Bodies
+    shorter than COMPRESSION_MIN_LENGTH and media types starting with one
+    of COMPRESSION_EXCLUDED_TYPES, already compressed, are sent as is.
+    Streaming responses are compressed chunk by chunk.
+    """
+
+    def process_response(self, request, response):
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_LENGTH
+        ):
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').lower()
+        if content_type.startswith(tuple(settings.COMPRESSION_EXCLUDED_TYPES)):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        compressor = self.get_compressor(request)
+        if compressor is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                compressor, response.streaming_content)
+            # The compressed size is only known once streamed.
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            content = compressor.compress(response.content)
+            content += compressor.finish()
+            # Send the compressed content only if it is actually shorter.
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        # A compressed body is not byte for byte the one of a strong ETag.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = compressor.encoding
+
+        return response
+
+    def get_compressor(self, request):
+        """Returns the compressor of the best coding the client accepts."""
+        accepted = parse_accept_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        compressors = []
+        if brotli is not None:
+            compressors.append(
+                (BrotliCompressor, settings.COMPRESSION_BROTLI_LEVEL))
+        compressors.append((GzipCompressor, settings.COMPRESSION_GZIP_LEVEL))
+
+        best, best_quality = None, 0
+        for compressor, level in compressors:
+            quality = accepted.get(
+                compressor.encoding, accepted.get('*', 0))
+            if quality > best_quality:
+                best, best_quality = (compressor, level), quality
+
+        return best[0](best[1]) if best else None
+
+    def compress_stream(self, compressor, stream):
+        for chunk in stream:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+class ReplicaPinningMiddleware(MiddlewareMixin):
+    """Routes the reads of safe requests to the replicas.
+
+    A request that writes pins the reads of its authenticated user to
+    the primary for REPLICA_PIN_SECONDS, so that they read their own
+    writes. Clients without a user are pinned by a cookie, and the
+    response tells the pin duration in the X-Primary-Pin header, for
+    clients to send it back.
+    """
+    cookie_name = 'primary_pinned'
+    header_name = 'X-Primary-Pin'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def process_request(self, request):
+        request._routing_token = routers.start_request(
+            replica_reads=(
+                request.method in self.safe_methods
+                and self.cookie_name not in request.COOKIES
+                and self.header_name not in request.headers
+            ),
+            request=request,
+        )
+
+    def process_response(self, request, response):
+        token = getattr(request, '_routing_token', None)
+        if token is None or not routers.end_request(token):
+            return response
+
+        user_id = routers.get_request_user_id(request)
+        if user_id is not None:
+            routers.pin_user(user_id)
+        response.set_cookie(
+            self.cookie_name,
+            '1',
+            max_age=settings.REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite='Lax',
+        )
+        response[self.header_name] = str(settings.REPLICA_PIN_SECONDS)
+
+        return response
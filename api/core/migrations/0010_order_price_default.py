@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_review_product_created_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=7, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_orderjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_variants',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProductImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='productimagejob',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'running'])), fields=['run_after'], name='imagejob_active_run_after_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productimagejob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('product',), name='unique_pending_image_job'),
+        ),
+    ]
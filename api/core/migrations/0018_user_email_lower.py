@@ -0,0 +1,60 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:33
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.functions.text
+
+
+def check_email_conflicts(apps, schema_editor):
+    """Fails listing the users whose emails differ only by case."""
+    User = apps.get_model('core', 'User')
+    Lower = django.db.models.functions.text.Lower
+    conflicts = User.objects.annotate(
+        email_lower=Lower('email'),
+    ).values('email_lower').annotate(
+        count=Count('id'),
+    ).filter(count__gt=1).values_list('email_lower', flat=True)
+    users = User.objects.annotate(
+        email_lower=Lower('email'),
+    ).filter(email_lower__in=list(conflicts)).order_by('email_lower', 'id')
+
+    if users:
+        rows = '\n'.join(f'  {user.id}: {user.email}' for user in users)
+        raise RuntimeError(
+            'Emails that differ only by case must be merged or changed '
+            'before the case-insensitive unique index is created:\n' + rows)
+
+
+class Migration(migrations.Migration):
+    # The index is built concurrently, which cannot run in a transaction,
+    # so that the users table is not locked against writes meanwhile.
+    atomic = False
+
+    dependencies = [
+        ('core', '0017_tokenrevocation'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_email_conflicts,
+                             migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                # An interrupted concurrent build leaves an invalid index.
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS user_email_lower_idx',
+                    migrations.RunSQL.noop,
+                ),
+                migrations.RunSQL(
+                    'CREATE UNIQUE INDEX CONCURRENTLY user_email_lower_idx '
+                    'ON core_user (LOWER(email))',
+                    'DROP INDEX CONCURRENTLY user_email_lower_idx',
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='user',
+                    index=models.Index(django.db.models.functions.text.Lower('email'), name='user_email_lower_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_idempotencykey_request'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tokenrevocation',
+            index=models.Index(fields=['revoked_at'], name='revocation_revoked_at_idx'),
+        ),
+    ]
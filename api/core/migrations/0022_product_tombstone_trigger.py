@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-18 07:41
+
+from django.db import migrations
+
+
+CREATE_TRIGGER = '''
+CREATE FUNCTION core_product_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO core_producttombstone (product_id, deleted_at)
+    SELECT id, clock_timestamp() FROM deleted_products
+    ON CONFLICT (product_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER product_tombstone
+    AFTER DELETE ON core_product
+    REFERENCING OLD TABLE AS deleted_products
+    FOR EACH STATEMENT EXECUTE FUNCTION core_product_tombstone();
+'''
+
+DROP_TRIGGER = '''
+DROP TRIGGER product_tombstone ON core_product;
+DROP FUNCTION core_product_tombstone();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_tokenrevocation_revoked_at_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
@@ -3,14 +3,36 @@ Project models.
 """
 import os
 import uuid
-
-from django.db import models
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models.functions import (
+    Cast,
+    Coalesce,
+    Greatest,
+    Lower,
+    NullIf,
+    )
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+    TrigramSimilarity,
+    )
 from django.contrib.auth.base_user import (
     BaseUserManager,
     AbstractBaseUser,
     )
 from django.contrib.auth.models import PermissionsMixin
 from django.conf import settings
+from django.utils import timezone
+
+from core import hashing
+from core.cache import bump_catalog_version
 
 
 def product_image_file_path(instance, filename):
@@ -21,6 +43,31 @@ def product_image_file_path(instance, filename):
     return os.path.join('uploads', 'product', filename)
 
 
+SEARCH_CONFIG = 'english'
+
+PRODUCT_SEARCH_VECTOR = (
+    SearchVector('title', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+)
+
+RATING_STARS = range(1, 6)
+
+
+def rating_count_field(star):
+    """Returns the name of the product field counting star ratings."""
+    return f'rating_{star}_count'
+
+
+def rating_average(total, count):
+    """Returns the expression of the average rating, 0 when unrated."""
+    return Coalesce(
+        Cast(total, models.DecimalField(max_digits=14, decimal_places=2))
+        / NullIf(count, 0),
+        0,
+        output_field=models.DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
 class UserManager(BaseUserManager):
     """Base user manager."""
 
@@ -40,6 +87,18 @@ class UserManager(BaseUserManager):
 
         return user
 
+    def with_email(self, email):
+        """Returns the users with an email, compared case-insensitively.
+
+        The comparison on lower(email) is served by user_email_lower_idx.
+        """
+        return self.alias(
+            email_lower=Lower('email'),
+        ).filter(email_lower=Lower(models.Value(email)))
+
+    def get_by_natural_key(self, username):
+        return self.with_email(username).get()
+
     def create_superuser(self, email, password):
         """Creates a superuser with is_staff and is_superuser to true."""
 
@@ -70,13 +129,163 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
+    tokens_revoked_at = models.DateTimeField(null=True, editable=False)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
+    class Meta:
+        # Unique in the database, see migration 0018: Django 3.2 has no
+        # functional unique constraints.
+        indexes = [
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
+
+    def set_password(self, raw_password):
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Checks the password off the request thread.
+
+        A correct password hashed by another hasher or cost than the
+        preferred one is rehashed.
+        """
+        is_correct, rehash = hashing.check_password(
+            raw_password, self.password)
+        if is_correct and rehash:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+
+        return is_correct
+
+
+class TimestampedQuerySet(models.QuerySet):
+    """Queryset keeping updated_at current on bulk updates."""
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+    def touch(self):
+        """Marks the rows as updated now."""
+        return self.update()
+
+
+class CatalogQuerySet(TimestampedQuerySet):
+    """Queryset of catalog entities, invalidating the catalog cache."""
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        bump_catalog_version()
+        return rows
+
+    def delete(self):
+        deleted = super().delete()
+        bump_catalog_version()
+        return deleted
+
+    def bulk_create(self, *args, **kwargs):
+        objs = super().bulk_create(*args, **kwargs)
+        bump_catalog_version()
+        return objs
+
+
+class CatalogModel(models.Model):
+    """Catalog entity, invalidating the catalog cache when written."""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump_catalog_version()
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        bump_catalog_version()
+        return deleted
+
+
+class ProductQuerySet(CatalogQuerySet):
+    """Product queryset."""
+
+    def update_search_vector(self):
+        """Refreshes the full-text search vector of the products."""
+        return self.update(search_vector=PRODUCT_SEARCH_VECTOR)
+
+    def search(self, text):
+        """Returns the products matching text, best ranked first.
+
+        Falls back to trigram similarity on the title when the full-text
+        query has no match, so that misspelled terms still find products.
+        """
+        query = SearchQuery(text, config=SEARCH_CONFIG,
+                            search_type='websearch')
+        matches = self.filter(search_vector=query)
+        if matches.exists():
+            rank = SearchRank(models.F('search_vector'), query)
+        else:
+            matches = self.filter(title__trigram_similar=text)
+            rank = TrigramSimilarity('title', text)
+
+        return matches.annotate(rank=rank).order_by('-rank', '-id')
+
+    def apply_rating(self, rating, delta=1):
+        """Adds delta ratings of the given stars to the rating aggregates.
+
+        The aggregates are updated in place in a single statement, a
+        negative delta removes ratings. Ratings outside of the star range
+        are not counted but still mark the rows as updated, and counts
+        never drop below zero: drift is fixed by the rebuild_ratings
+        command.
+        """
+        if rating not in RATING_STARS:
+            return self.touch()
+        counts = {
+            star: models.F(rating_count_field(star)) for star in RATING_STARS
+        }
+        counts[rating] = Greatest(counts[rating] + delta, 0)
+        total = sum(star * counts[star] for star in RATING_STARS)
+        count = Greatest(models.F('rating_count') + delta, 0)
+
+        return self.update(
+            rating_count=count,
+            rating_avg=rating_average(total, count),
+            **{rating_count_field(rating): counts[rating]},
+        )
+
+    def rebuild_ratings(self):
+        """Recomputes the rating aggregates from the reviews."""
+        reviews = Review.objects.filter(
+            product=models.OuterRef('pk'),
+            rating__in=RATING_STARS,
+        ).order_by().values('product')
+
+        def count(**filters):
+            return Coalesce(models.Subquery(
+                reviews.filter(**filters).annotate(
+                    count=models.Count('pk')).values('count')
+            ), 0)
+
+        counts = {
+            rating_count_field(star): count(rating=star)
+            for star in RATING_STARS
+        }
+        total = Coalesce(models.Subquery(
+            reviews.annotate(total=models.Sum('rating')).values('total')
+        ), 0)
+
+        return self.update(
+            rating_count=count(),
+            rating_avg=rating_average(total, count()),
+            **counts,
+        )
+
 
-class Product(models.Model):
+class Product(CatalogModel):
     """Product entity class."""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -86,12 +295,71 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=5, decimal_places=2)
     description = models.TextField(blank=True)
     image = models.ImageField(null=True, upload_to=product_image_file_path)
+    image_variants = models.JSONField(default=dict, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    rating_avg = models.DecimalField(
+        max_digits=3, decimal_places=2, default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['rating_avg', 'id'],
+                         name='product_rating_avg_idx'),
+            models.Index(fields=['rating_count', 'id'],
+                         name='product_rating_count_idx'),
+            models.Index(fields=['updated_at'],
+                         name='product_updated_at_idx'),
+            GinIndex(fields=['search_vector'],
+                     name='product_search_vector_idx'),
+            GinIndex(fields=['title'],
+                     name='product_title_trgm_idx',
+                     opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.title
 
+    @property
+    def rating_histogram(self):
+        """Returns the number of ratings per star."""
+        return {
+            str(star): getattr(self, rating_count_field(star))
+            for star in RATING_STARS
+        }
+
+
+class ProductTombstone(models.Model):
+    """Deleted product, kept for the clients syncing the catalog.
+
+    Tombstones are inserted by the product_tombstone trigger of the
+    products table, once per delete statement, see migration 0022.
+    """
+    product_id = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
 
-class Review(models.Model):
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at'],
+                         name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return str(self.product_id)
+
+
+class ReviewQuerySet(CatalogQuerySet):
+    """Review queryset."""
+
+
+class Review(CatalogModel):
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -101,20 +369,74 @@ class Review(models.Model):
     rating = models.IntegerField(null=True, blank=True, default=0)
     comment = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ReviewQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'created_at'],
+                         name='review_product_created_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+# Largest price an order holds, see Order.price.
+ORDER_PRICE_MAX = Decimal('99999.99')
+
+
+class OrderQuerySet(TimestampedQuerySet):
+    """Order queryset."""
+
+    def update_price(self):
+        """Sets the price of the orders to the sum of their items."""
+        total = OrderItem.objects.filter(
+            order=models.OuterRef('pk'),
+        ).order_by().values('order').annotate(
+            total=models.Sum(models.F('price') * models.F('quantity')),
+        ).values('total')
+
+        return self.update(price=Coalesce(models.Subquery(total), 0))
+
+    def over_price_max(self):
+        """Keeps the orders whose items sum over ORDER_PRICE_MAX."""
+        total = OrderItem.objects.filter(
+            order=models.OuterRef('pk'),
+        ).order_by().values('order').annotate(
+            total=models.Sum(models.F('price') * models.F('quantity')),
+        ).values('total')
+
+        return self.annotate(
+            items_total=models.Subquery(total),
+        ).filter(items_total__gt=ORDER_PRICE_MAX)
+
+    def process(self):
+        """Marks the pending orders as done, in a single statement.
+
+        Orders already done are left untouched, so processing an order
+        twice does not move its processed_at.
+        """
+        return self.filter(done=False).update(
+            done=True,
+            processed_at=timezone.now(),
+        )
+
+
 class Order(models.Model):
     user = models.ForeignKey(
             settings.AUTH_USER_MODEL,
             on_delete=models.CASCADE,
             null=True)
-    price = models.DecimalField(max_digits=7, decimal_places=2, null=True)
+    price = models.DecimalField(
+        max_digits=7, decimal_places=2, null=True, default=0)
     done = models.BooleanField(default=False)
     processed_at = models.DateTimeField(auto_now_add=False, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrderQuerySet.as_manager()
 
     def __str__(self):
         return str(self.created_at)
@@ -133,7 +455,215 @@ class OrderItem(models.Model):
     )
     name = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=7, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TimestampedQuerySet.as_manager()
 
     def __str__(self):
         return self.name
+
+
+class JobQuerySet(models.QuerySet):
+    """Background job queryset."""
+
+    def active(self):
+        """Returns the jobs waiting for or being processed."""
+        return self.filter(status__in=[
+            Job.Status.PENDING,
+            Job.Status.RUNNING,
+        ])
+
+    def enqueue(self, target_ids):
+        """Queues a job for every target that has no active job."""
+        field = self.model.target_field
+        self.bulk_create(
+            [self.model(**{f'{field}_id': pk}) for pk in target_ids],
+            ignore_conflicts=True,
+        )
+        return self.active().filter(**{f'{field}__in': target_ids})
+
+    def claim(self, count, lease=timedelta(minutes=5)):
+        """Claims up to count due jobs for the calling worker.
+
+        Rows locked by other workers are skipped rather than waited for.
+        A claimed job is leased: if its worker dies, it is due again once
+        the lease is over.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(
+                self.active().filter(run_after__lte=now).select_for_update(
+                    skip_locked=True,
+                ).order_by('run_after', 'id')[:count]
+            )
+            self.filter(pk__in=[job.pk for job in jobs]).update(
+                status=Job.Status.RUNNING,
+                attempts=models.F('attempts') + 1,
+                run_after=now + lease,
+            )
+        for job in jobs:
+            job.status = Job.Status.RUNNING
+            job.attempts += 1
+
+        return jobs
+
+
+class Job(models.Model):
+    """Base of the jobs queued for the background workers.
+
+    Subclasses add a foreign key to the job target, named target_field.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        RUNNING = 'running'
+        DONE = 'done'
+        FAILED = 'failed'
+
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return f'{self.target_field} {self.pk} {self.status}'
+
+
+class OrderJob(Job):
+    """Queued processing of an order."""
+    target_field = 'order'
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run_after'],
+                         name='orderjob_active_run_after_idx',
+                         condition=models.Q(status__in=['pending',
+                                                        'running'])),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['order'],
+                                    name='unique_active_order_job',
+                                    condition=models.Q(
+                                        status__in=['pending', 'running'])),
+        ]
+
+
+class ProductImageJob(Job):
+    """Queued generation of the resized variants of a product image.
+
+    Only pending jobs are unique, so that an image replaced while its
+    previous version is being processed gets a job of its own.
+    """
+    target_field = 'product'
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run_after'],
+                         name='imagejob_active_run_after_idx',
+                         condition=models.Q(status__in=['pending',
+                                                        'running'])),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['product'],
+                                    name='unique_pending_image_job',
+                                    condition=models.Q(status='pending')),
+        ]
+
+
+def idempotency_key_expiry():
+    """Returns the creation time before which idempotency keys expired."""
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    """Idempotency key queryset."""
+
+    def expired(self):
+        """Returns the keys older than IDEMPOTENCY_KEY_TTL seconds."""
+        return self.filter(created_at__lt=idempotency_key_expiry())
+
+
+class IdempotencyKey(models.Model):
+    """Response stored for a request sent with an Idempotency-Key.
+
+    Keys are scoped to the user and the path of the request, and hold
+    the hash of its body so that a key reused for another request is
+    told apart from a retry.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    path = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'],
+                         name='idempotency_created_at_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'path', 'key'],
+                                    name='unique_user_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return self.key
+
+    def is_expired(self):
+        """Returns whether the stored response is no longer replayed."""
+        return self.created_at < idempotency_key_expiry()
+
+
+class TokenRevocationQuerySet(models.QuerySet):
+    """Token revocation queryset."""
+
+    def expired(self):
+        """Returns the revocations of the tokens expired by now."""
+        return self.filter(expires_at__lt=timezone.now())
+
+
+class TokenRevocation(models.Model):
+    """Revoked refresh token, kept until the token expires.
+
+    Expired revocations are deleted by the clear_token_revocations
+    command.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TokenRevocationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'],
+                         name='revocation_expires_at_idx'),
+            models.Index(fields=['revoked_at'],
+                         name='revocation_revoked_at_idx'),
+        ]
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,62 @@
+"""
+Fast JSON and MessagePack parsers.
+"""
+from decimal import Decimal
+
+import msgpack
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from core.renderers import (
+    MSGPACK_DECIMAL_EXT,
+    FastJSONRenderer,
+    MessagePackRenderer,
+    orjson,
+    )
+
+
+class FastJSONParser(JSONParser):
+    """JSON parser decoding with orjson when it is installed.
+
+    orjson rejects NaN and Infinity like the strict JSONParser, other
+    encodings than UTF-8 and the non strict mode use JSONParser.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if (
+            orjson is None or not self.strict
+            or encoding.lower().replace('_', '-') != 'utf-8'
+        ):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackParser(BaseParser):
+    """Parser of MessagePack, unpacking Decimals losslessly."""
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(
+                stream.read(),
+                ext_hook=self.ext_hook,
+                strict_map_key=False,
+            )
+        except (ValueError, TypeError, ArithmeticError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
+
+    def ext_hook(self, code, data):
+        if code == MSGPACK_DECIMAL_EXT:
+            return Decimal(data.decode())
+        return msgpack.ExtType(code, data)
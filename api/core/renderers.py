@@ -0,0 +1,101 @@
+"""
+Fast JSON and MessagePack renderers.
+"""
+import math
+import re
+from decimal import Decimal
+
+import msgpack
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+MSGPACK_DECIMAL_EXT = 1
+
+# Output that may hold a float orjson writes unlike the stdlib: null for
+# NaN and Infinity, or an exponent without sign or padding.
+MAYBE_UNLIKE_FLOAT = re.compile(rb'null|[0-9]e-?[0-9]')
+
+
+def has_unlike_floats(data):
+    """Returns whether data holds a float orjson writes unlike the stdlib."""
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif isinstance(obj, float):
+            if not math.isfinite(obj) or 'e' in repr(obj):
+                return True
+
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer encoding with orjson when it is installed.
+
+    Decimals, datetimes, dates and times are handed to the encoder of
+    DRF so the output is byte for byte the one of JSONRenderer. Indented
+    output, data orjson rejects, and floats orjson writes differently,
+    in exponent notation or not finite, are rendered by JSONRenderer,
+    which raises on NaN and Infinity.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if (
+            self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if MAYBE_UNLIKE_FLOAT.search(ret) and has_unlike_floats(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape \u2028 and \u2029 like JSONRenderer.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace(
+            '\u2029'.encode(), b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer serializing to MessagePack.
+
+    Decimals are packed losslessly as their string in the extension type
+    MSGPACK_DECIMAL_EXT, the other types unknown to MessagePack are
+    encoded like JSONRenderer does, datetimes as ISO 8601 strings.
+    Integers must fit in 64 bits.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = encoders.JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=self.default, use_bin_type=True)
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return msgpack.ExtType(MSGPACK_DECIMAL_EXT, str(obj).encode())
+        return self.encoder_class().default(obj)
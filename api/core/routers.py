@@ -0,0 +1,193 @@
+"""
+Read replica database routing.
+
+Reads of the safe requests go to a healthy replica of REPLICA_DATABASES,
+everything else goes to the primary. A request that writes is pinned
+to the primary from then on, and so are the requests of the same user
+or client for REPLICA_PIN_SECONDS after it, see ReplicaPinningMiddleware.
+"""
+import contextlib
+import contextvars
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+
+def pin_key(user_id):
+    """Returns the cache key pinning a user to the primary."""
+    return f'replica:pin:{user_id}'
+
+
+def get_request_user_id(request):
+    """Returns the id of the user authenticated by the api, if any.
+
+    The lazy user of the session is not evaluated, loading it would
+    read the database from within the router.
+    """
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    if user is None or not user.is_authenticated:
+        return None
+
+    return user.pk
+
+
+class RoutingState:
+    """Routing state of the current request."""
+
+    def __init__(self, replica_reads, request=None):
+        self.replica_reads = replica_reads
+        self.request = request
+        self.wrote = False
+        self.pinned = None
+
+    def is_pinned(self):
+        """Returns whether the user of the request wrote lately."""
+        if self.pinned is None:
+            user_id = get_request_user_id(self.request)
+            if user_id is None:
+                return False
+            self.pinned = bool(cache.get(pin_key(user_id)))
+
+        return self.pinned
+
+
+_routing_state = contextvars.ContextVar('routing_state', default=None)
+
+
+def start_request(replica_reads, request=None):
+    """Starts routing a request, returns the token to end it with."""
+    return _routing_state.set(RoutingState(replica_reads, request))
+
+
+def end_request(token):
+    """Ends routing a request, returns whether it wrote."""
+    state = _routing_state.get()
+    _routing_state.reset(token)
+
+    return state is not None and state.wrote
+
+
+def pin_user(user_id):
+    """Pins the reads of a user to the primary for REPLICA_PIN_SECONDS."""
+    cache.set(pin_key(user_id), 1, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+@contextlib.contextmanager
+def use_primary():
+    """Routes the reads of the block to the primary."""
+    state = _routing_state.get()
+    if state is None:
+        yield
+        return
+
+    replica_reads = state.replica_reads
+    state.replica_reads = False
+    try:
+        yield
+    finally:
+        state.replica_reads = replica_reads
+
+
+class ReplicaPool:
+    """Replicas of the primary, health-checked at most once per interval.
+
+    A replica is healthy when it answers and replays the primary with a
+    lag under REPLICA_MAX_LAG seconds.
+    """
+    lag_sql = (
+        'SELECT COALESCE(CASE '
+        'WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) '
+        'END, 0)'
+    )
+
+    def __init__(self, aliases):
+        self.aliases = list(aliases)
+        self.checks = {}
+        self._lock = threading.Lock()
+
+    def check(self, alias):
+        """Returns whether a replica is healthy."""
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute(self.lag_sql)
+                lag, = cursor.fetchone()
+        except Exception:
+            connections[alias].close()
+            return False
+
+        return lag <= settings.REPLICA_MAX_LAG
+
+    def is_healthy(self, alias):
+        """Returns the last health of a replica, checked if it is due."""
+        now = time.monotonic()
+        with self._lock:
+            healthy, checked_at = self.checks.get(alias, (False, None))
+            due = (
+                checked_at is None
+                or now - checked_at >= settings.REPLICA_CHECK_INTERVAL
+            )
+            if due:
+                self.checks[alias] = (healthy, now)
+        if due:
+            healthy = self.check(alias)
+            with self._lock:
+                self.checks[alias] = (healthy, now)
+
+        return healthy
+
+    def choose(self):
+        """Returns a random healthy replica, None if there is none."""
+        healthy = [alias for alias in self.aliases if self.is_healthy(alias)]
+
+        return random.choice(healthy) if healthy else None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_replica_pool():
+    """Returns the replica pool of the process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.aliases != settings.REPLICA_DATABASES:
+            _pool = ReplicaPool(settings.REPLICA_DATABASES)
+
+    return _pool
+
+
+class ReplicaRouter:
+    """Routes the reads of the safe requests to the replicas."""
+
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        if (
+            state is None
+            or not state.replica_reads
+            or state.wrote
+            or state.is_pinned()
+        ):
+            return None
+
+        return get_replica_pool().choose()
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None:
+            state.wrote = True
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,82 @@
+"""
+Catalog cache unit tests.
+"""
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.cache import (
+    CATALOG_VERSION_KEY,
+    bump_catalog_version,
+    catalog_cache_key,
+    get_catalog_version,
+    get_or_build,
+)
+from core.checks import check_shared_catalog_cache
+
+
+class CatalogCacheTests(TestCase):
+    """Catalog cache unit tests."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_catalog_version(self):
+        """Test bumping the version changes the cache keys."""
+        version = get_catalog_version()
+        key = catalog_cache_key('/api/products/?q=shoes')
+
+        bump_catalog_version()
+
+        self.assertEqual(get_catalog_version(), version + 1)
+        self.assertNotEqual(catalog_cache_key('/api/products/?q=shoes'), key)
+
+    def test_evicted_catalog_version_never_reused(self):
+        """Test a version evicted from the cache is seeded higher."""
+        versions = [get_catalog_version()]
+        for evict in [get_catalog_version, bump_catalog_version]:
+            bump_catalog_version()
+            versions.append(get_catalog_version())
+            cache.delete(CATALOG_VERSION_KEY)
+            evict()
+            versions.append(get_catalog_version())
+
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_get_or_build_caches(self):
+        """Test a value is built once then served from the cache."""
+        build = Mock(return_value={'id': 1})
+
+        get_or_build('key', build)
+        value = get_or_build('key', build)
+
+        self.assertEqual(value, {'id': 1})
+        build.assert_called_once()
+
+    @patch('core.cache.time.sleep')
+    def test_get_or_build_waits_for_lock(self, sleep):
+        """Test a miss waits for the caller already rebuilding it."""
+        cache.add('key:lock', 1)
+        sleep.side_effect = lambda wait: cache.set('key', 'built')
+        build = Mock()
+
+        value = get_or_build('key', build)
+
+        self.assertEqual(value, 'built')
+        build.assert_not_called()
+
+
+class SharedCatalogCacheCheckTests(TestCase):
+    """Catalog cache system check tests."""
+
+    @override_settings(WEB_CONCURRENCY=4)
+    def test_local_cache_with_workers_refused(self):
+        """Test a local memory cache is refused with several workers."""
+        errors = check_shared_catalog_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    def test_local_cache_with_one_worker_allowed(self):
+        """Test a local memory cache is allowed with one worker."""
+        self.assertEqual(check_shared_catalog_cache(None), [])
@@ -6,9 +6,25 @@ from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.models import (
+    IdempotencyKey,
+    Order,
+    OrderItem,
+    OrderJob,
+    Product,
+    Review,
+    TokenRevocation,
+    )
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -33,3 +49,148 @@ class TestCommands(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class TestRebuildRatingsCommand(TestCase):
+    """Test the rebuild_ratings command."""
+
+    def test_rebuild_ratings(self):
+        """Test the ratings of every product are rebuilt by batches."""
+        user = get_user_model().objects.create_user(
+            email='email@example.com',
+            password='pass1234',
+        )
+        products = [
+            Product.objects.create(user=user, title=f'product {i}',
+                                   price=Decimal('5.50'))
+            for i in range(3)
+        ]
+        for product in products:
+            Review.objects.create(product=product, user=user, rating=2)
+
+        call_command('rebuild_ratings', batch_size=2)
+
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.rating_count, 1)
+            self.assertEqual(product.rating_avg, Decimal('2.00'))
+
+
+class TestUpdateOrderPricesCommand(TestCase):
+    """Test the update_order_prices command."""
+
+    def test_update_order_prices(self):
+        """Test the price of every order is recomputed by batches."""
+        user = get_user_model().objects.create_user(
+            email='email@example.com',
+            password='pass1234',
+        )
+        orders = [Order.objects.create(user=user) for i in range(3)]
+        for order in orders:
+            OrderItem.objects.create(order=order, name='item',
+                                     price=Decimal('3.10'))
+
+        call_command('update_order_prices', batch_size=2)
+
+        for order in orders:
+            order.refresh_from_db()
+            self.assertEqual(order.price, Decimal('3.10'))
+
+
+class TestClearIdempotencyKeysCommand(TestCase):
+    """Test the clear_idempotency_keys command."""
+
+    def test_clear_idempotency_keys(self):
+        """Test only the expired keys are deleted, by batches."""
+        user = get_user_model().objects.create_user(
+            email='email@example.com',
+            password='pass1234',
+        )
+        for key in ['a', 'b', 'c', 'd']:
+            IdempotencyKey.objects.create(user=user, path='/', key=key)
+        IdempotencyKey.objects.exclude(key='d').update(
+            created_at=timezone.now() - timedelta(days=2))
+
+        call_command('clear_idempotency_keys', batch_size=2,
+                     stdout=StringIO())
+
+        self.assertQuerysetEqual(
+            IdempotencyKey.objects.values_list('key', flat=True), ['d'])
+
+
+class TestClearTokenRevocationsCommand(TestCase):
+    """Test the clear_token_revocations command."""
+
+    def test_clear_token_revocations(self):
+        """Test only the revocations of expired tokens are deleted."""
+        now = timezone.now()
+        for jti in ['a', 'b', 'c']:
+            TokenRevocation.objects.create(
+                jti=jti, expires_at=now - timedelta(days=1))
+        TokenRevocation.objects.create(
+            jti='d', expires_at=now + timedelta(days=1))
+
+        call_command('clear_token_revocations', batch_size=2,
+                     stdout=StringIO())
+
+        self.assertQuerysetEqual(
+            TokenRevocation.objects.values_list('jti', flat=True), ['d'])
+
+
+class TestProcessOrderJobsCommand(TestCase):
+    """Test the process_order_jobs worker command."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email='email@example.com',
+            password='pass1234',
+        )
+        self.orders = [Order.objects.create(user=user) for i in range(3)]
+        OrderJob.objects.enqueue([order.id for order in self.orders])
+
+    def test_process_order_jobs(self):
+        """Test every queued order is processed by batches."""
+        call_command('process_order_jobs', once=True, batch_size=2,
+                     stdout=StringIO())
+
+        self.assertFalse(Order.objects.filter(done=False).exists())
+        self.assertEqual(
+            OrderJob.objects.filter(status=OrderJob.Status.DONE).count(), 3)
+
+    @patch('core.models.OrderQuerySet.process')
+    def test_process_order_jobs_retry(self, patched_process):
+        """Test failed jobs are retried later, then marked failed."""
+        patched_process.side_effect = RuntimeError('payment down')
+
+        call_command('process_order_jobs', once=True, max_attempts=2,
+                     stdout=StringIO(), stderr=StringIO())
+
+        jobs = OrderJob.objects.all()
+        for job in jobs:
+            self.assertEqual(job.status, OrderJob.Status.PENDING)
+            self.assertEqual(job.attempts, 1)
+            self.assertIn('payment down', job.last_error)
+        self.assertFalse(OrderJob.objects.claim(10))
+
+        jobs.update(run_after=timezone.now())
+        call_command('process_order_jobs', once=True, max_attempts=2,
+                     stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(
+            OrderJob.objects.filter(status=OrderJob.Status.FAILED).count(),
+            3,
+        )
+        self.assertFalse(Order.objects.filter(done=True).exists())
+
+
+class TestBenchmarkJsonCommand(SimpleTestCase):
+    """Test the benchmark_json command."""
+
+    def test_benchmark_json(self):
+        """Test timing each renderer on each payload."""
+        out = StringIO()
+
+        call_command('benchmark_json', count=10, repeat=1, stdout=out)
+
+        self.assertIn('FastJSONRenderer', out.getvalue())
+        self.assertEqual(out.getvalue().count('per 10 products'), 4)
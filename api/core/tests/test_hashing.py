@@ -0,0 +1,92 @@
+"""
+Password hashing unit tests.
+"""
+import threading
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+
+from core.hashing import BoundedExecutor, HashingUnavailable
+
+
+class BoundedExecutorTests(TestCase):
+    """Bounded executor unit tests."""
+
+    def test_run_returns_result(self):
+        """Test a task is run on the pool and its result returned."""
+        executor = BoundedExecutor(workers=1, queue=0)
+
+        name = executor.run(lambda: threading.current_thread().name)
+
+        self.assertTrue(name.startswith('hashing'))
+
+    def test_saturated_pool_refuses_tasks(self):
+        """Test tasks past the pending limit are refused."""
+        executor = BoundedExecutor(workers=1, queue=1)
+        executor.slots.acquire()
+        executor.slots.acquire()
+
+        with self.assertRaises(HashingUnavailable):
+            executor.run(lambda: None)
+
+        executor.slots.release()
+        self.assertIsNone(executor.run(lambda: None))
+
+    def test_timeout_raises_unavailable(self):
+        """Test a task not done in time raises HashingUnavailable."""
+        executor = BoundedExecutor(workers=1, queue=0)
+        release = threading.Event()
+
+        with self.assertRaises(HashingUnavailable):
+            executor.run(release.wait, timeout=0.01)
+
+        release.set()
+
+
+class PasswordRehashTests(TestCase):
+    """Password rehash on login tests."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='email@mail.com',
+            password='password1234',
+        )
+
+    def test_password_hashed_with_argon2(self):
+        """Test passwords are hashed with Argon2."""
+        self.assertTrue(self.user.password.startswith('argon2$'))
+
+    def test_pbkdf2_password_rehashed_on_check(self):
+        """Test a PBKDF2 password is rehashed with Argon2 once checked."""
+        self.user.password = make_password(
+            'password1234', hasher='pbkdf2_sha256')
+        self.user.save()
+
+        self.assertTrue(self.user.check_password('password1234'))
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2$'))
+        self.assertTrue(self.user.check_password('password1234'))
+
+    def test_wrong_password_not_rehashed(self):
+        """Test a wrong password leaves the hash unchanged."""
+        encoded = make_password('password1234', hasher='pbkdf2_sha256')
+        self.user.password = encoded
+        self.user.save()
+
+        self.assertFalse(self.user.check_password('wrong-password'))
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, encoded)
+
+    def test_cost_change_rehashes_password(self):
+        """Test a password is rehashed when the Argon2 cost changes."""
+        encoded = self.user.password
+
+        with override_settings(ARGON2_TIME_COST=3):
+            self.assertTrue(self.user.check_password('password1234'))
+
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, encoded)
+        self.assertIn('t=3', self.user.password)
@@ -0,0 +1,105 @@
+"""
+Compression middleware unit tests.
+"""
+import gzip
+import zlib
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core.middleware import (
+    CompressionMiddleware,
+    brotli,
+    parse_accept_encoding,
+)
+
+
+CONTENT = b'{"title": "Product title", "price": "5.50"}' * 100
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Compression middleware tests."""
+
+    def compress(self, response, accept_encoding):
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        middleware = CompressionMiddleware(lambda request: response)
+
+        return middleware(request)
+
+    def test_parse_accept_encoding(self):
+        """Test parsing the codings and their q-values."""
+        self.assertEqual(
+            parse_accept_encoding('gzip, br;q=0.5, identity; q=0, *;q=x'),
+            {'gzip': 1.0, 'br': 0.5, 'identity': 0.0, '*': 0.0},
+        )
+
+    @skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_preferred(self):
+        """Test brotli is preferred to gzip."""
+        response = self.compress(HttpResponse(CONTENT), 'gzip, deflate, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), CONTENT)
+        self.assertEqual(response['Content-Length'],
+                         str(len(response.content)))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_gzip_by_quality(self):
+        """Test the coding with the highest q-value is used."""
+        response = self.compress(HttpResponse(CONTENT), 'br;q=0.5, gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), CONTENT)
+
+    @patch('core.middleware.brotli', None)
+    def test_gzip_without_brotli(self):
+        """Test gzip is used when brotli is not installed."""
+        response = self.compress(HttpResponse(CONTENT), 'br, gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_not_accepted(self):
+        """Test nothing is compressed without an accepted coding."""
+        response = self.compress(HttpResponse(CONTENT), 'identity')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, CONTENT)
+
+    def test_small_body(self):
+        """Test small bodies are not compressed."""
+        response = self.compress(HttpResponse(b'{}'), 'gzip')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_compressed_media(self):
+        """Test already compressed media types are not compressed."""
+        response = self.compress(
+            HttpResponse(CONTENT, content_type='image/jpeg'), 'gzip')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        """Test streaming responses are compressed chunk by chunk."""
+        chunks = [CONTENT[:1000], CONTENT[1000:]]
+        response = self.compress(StreamingHttpResponse(chunks), 'gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        decompressor = zlib.decompressobj(31)
+        stream = iter(response.streaming_content)
+        self.assertEqual(decompressor.decompress(next(stream)), chunks[0])
+        content = chunks[0] + b''.join(
+            decompressor.decompress(data) for data in stream)
+        self.assertEqual(content, CONTENT)
+
+    def test_weak_etag(self):
+        """Test a strong ETag is made weak."""
+        response = HttpResponse(CONTENT)
+        response['ETag'] = '"abc"'
+
+        response = self.compress(response, 'gzip')
+
+        self.assertEqual(response['ETag'], 'W/"abc"')
@@ -10,7 +10,8 @@ from core.models import (
     Product,
     Review,
     Order,
-    OrderItem)
+    OrderItem,
+    ProductTombstone)
 from core import models
 
 from unittest.mock import patch
@@ -152,3 +153,93 @@ class TestModels(TestCase):
             price=Decimal('1.99'),
         )
         self.assertEqual(str(orderItem), orderItem.name)
+
+    def test_apply_rating(self):
+        """Testing the incremental update of the product ratings."""
+        user = create_user()
+        product = create_product(user=user)
+        products = Product.objects.filter(pk=product.pk)
+
+        products.apply_rating(5)
+        products.apply_rating(4)
+        products.apply_rating(4)
+        products.apply_rating(5, delta=-1)
+        products.apply_rating(0)
+
+        product.refresh_from_db()
+        self.assertEqual(product.rating_count, 2)
+        self.assertEqual(product.rating_avg, Decimal('4.00'))
+        self.assertEqual(
+            product.rating_histogram,
+            {'1': 0, '2': 0, '3': 0, '4': 2, '5': 0},
+        )
+
+    def test_apply_unstarred_rating_touches_product(self):
+        """Testing a rating outside of the stars marks the product updated."""
+        user = create_user()
+        product = create_product(user=user)
+
+        Product.objects.filter(pk=product.pk).apply_rating(0)
+
+        updated_at = product.updated_at
+        product.refresh_from_db()
+        self.assertGreater(product.updated_at, updated_at)
+        self.assertEqual(product.rating_count, 0)
+
+    def test_product_delete_leaves_tombstones(self):
+        """Testing every delete path of products leaves tombstones."""
+        user = create_user()
+        products = [
+            create_product(user=user, title=str(i)) for i in range(3)]
+        other_user = create_user(email='other@example.com')
+        cascaded = create_product(user=other_user)
+        ids = {products[0].pk, products[1].pk, cascaded.pk}
+
+        products[0].delete()
+        Product.objects.filter(pk=products[1].pk).delete()
+        other_user.delete()
+
+        self.assertEqual(
+            set(ProductTombstone.objects.values_list(
+                'product_id', flat=True)),
+            ids,
+        )
+
+    def test_rebuild_ratings(self):
+        """Testing the rebuild of the product ratings from reviews."""
+        user = create_user()
+        product = create_product(user=user)
+        unrated = create_product(user=user, title='unrated')
+        for rating in [5, 4, 4, 0]:
+            Review.objects.create(product=product, user=user, rating=rating)
+        Product.objects.filter(pk=unrated.pk).apply_rating(3)
+
+        Product.objects.rebuild_ratings()
+
+        product.refresh_from_db()
+        self.assertEqual(product.rating_count, 3)
+        self.assertEqual(product.rating_avg, Decimal('4.33'))
+        self.assertEqual(product.rating_4_count, 2)
+        self.assertEqual(product.rating_5_count, 1)
+        unrated.refresh_from_db()
+        self.assertEqual(unrated.rating_count, 0)
+        self.assertEqual(unrated.rating_avg, Decimal('0'))
+        self.assertEqual(unrated.rating_3_count, 0)
+
+    def test_update_order_price(self):
+        """Testing the order price is set to the sum of its items."""
+        user = create_user()
+        product = create_product(user=user)
+        order = Order.objects.create(user=user, price=Decimal('99.99'))
+        empty_order = Order.objects.create(user=user, price=Decimal('9.99'))
+        for price, quantity in [('1.99', 2), ('2.50', 1)]:
+            OrderItem.objects.create(product=product, order=order,
+                                     name='item', price=Decimal(price),
+                                     quantity=quantity)
+
+        Order.objects.update_price()
+
+        order.refresh_from_db()
+        self.assertEqual(order.price, Decimal('6.48'))
+        empty_order.refresh_from_db()
+        self.assertEqual(empty_order.price, Decimal('0'))
@@ -0,0 +1,135 @@
+"""
+Fast JSON and MessagePack renderers and parsers unit tests.
+"""
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+import msgpack
+
+from django.test import SimpleTestCase
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import Serializer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.parsers import FastJSONParser, MessagePackParser
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+DATA = {
+    'price': Decimal('5.50'),
+    'created_at': datetime(2022, 9, 30, 9, 40, 1, 123456,
+                           tzinfo=timezone.utc),
+    'id': uuid.UUID('12345678123456781234567812345678'),
+    'title': 'line\u2028separator',
+    'items': [1, 2.5, None, True],
+    'big': 2 ** 70,
+}
+
+
+class FastJSONTests(SimpleTestCase):
+    """Fast JSON renderer and parser tests."""
+
+    def test_render_same_as_json_renderer(self):
+        """Test the output is the one of the DRF JSON renderer."""
+        self.assertEqual(
+            FastJSONRenderer().render(DATA),
+            JSONRenderer().render(DATA),
+        )
+
+    def test_render_floats_same_as_json_renderer(self):
+        """Test floats in exponent notation are written like the stdlib."""
+        serializer = Serializer()
+        data = ReturnDict([('results', ReturnList([
+            OrderedDict(x=1e16), OrderedDict(x=1e-07),
+            OrderedDict(x=-2.5e-05), OrderedDict(x=0.1),
+            OrderedDict(x=1e22), OrderedDict(x=None),
+        ], serializer=serializer))], serializer=serializer)
+
+        self.assertEqual(
+            FastJSONRenderer().render(data),
+            JSONRenderer().render(data),
+        )
+
+    def test_render_non_finite_floats_error(self):
+        """Test NaN and Infinity are rejected like the DRF JSON renderer."""
+        serializer = Serializer()
+        for value in [float('nan'), float('inf'), float('-inf')]:
+            data = ReturnDict([('results', ReturnList(
+                [OrderedDict(value=value)], serializer=serializer,
+            ))], serializer=serializer)
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render(data)
+
+    def test_render_indent(self):
+        """Test indented output is left to the DRF JSON renderer."""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(DATA, media_type),
+            JSONRenderer().render(DATA, media_type),
+        )
+
+    @patch('core.renderers.orjson', None)
+    def test_render_without_orjson(self):
+        """Test the stdlib is used when orjson is not installed."""
+        self.assertEqual(
+            FastJSONRenderer().render(DATA),
+            JSONRenderer().render(DATA),
+        )
+
+    def test_parse(self):
+        """Test parsing a JSON body."""
+        data = FastJSONParser().parse(BytesIO(b'{"price": 5.5, "a": [1]}'))
+
+        self.assertEqual(data, {'price': 5.5, 'a': [1]})
+
+    def test_parse_invalid(self):
+        """Test invalid JSON and NaN are rejected."""
+        for body in [b'{"price": ', b'{"price": NaN}']:
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(BytesIO(body))
+
+    @patch('core.parsers.orjson', None)
+    def test_parse_without_orjson(self):
+        """Test the stdlib is used when orjson is not installed."""
+        data = FastJSONParser().parse(BytesIO(b'{"price": 5.5}'))
+
+        self.assertEqual(data, {'price': 5.5})
+
+
+class MessagePackTests(SimpleTestCase):
+    """MessagePack renderer and parser tests."""
+
+    def test_decimal_round_trip(self):
+        """Test Decimals are packed and unpacked losslessly."""
+        data = {'price': Decimal('12345678901234567890.123456789'),
+                'items': [Decimal('0.10'), 'text', None]}
+
+        packed = MessagePackRenderer().render(data)
+
+        self.assertEqual(MessagePackParser().parse(BytesIO(packed)), data)
+
+    def test_render_like_json(self):
+        """Test the other types are encoded like the JSON renderer."""
+        data = {key: value for key, value in DATA.items()
+                if key not in ('price', 'big')}
+
+        packed = MessagePackRenderer().render(data)
+
+        self.assertEqual(
+            msgpack.unpackb(packed),
+            FastJSONParser().parse(BytesIO(FastJSONRenderer().render(data))),
+        )
+
+    def test_parse_invalid(self):
+        """Test invalid MessagePack is rejected."""
+        for body in [b'\x92\x01', msgpack.packb(1) + b'\x01',
+                     msgpack.packb(msgpack.ExtType(1, b'nope'))]:
+            with self.assertRaises(ParseError):
+                MessagePackParser().parse(BytesIO(body))
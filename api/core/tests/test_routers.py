@@ -0,0 +1,178 @@
+"""
+Read replica routing tests.
+"""
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import routers
+from core.models import Product
+from core.routers import ReplicaPool, ReplicaRouter
+
+
+class ReplicaRouterTests(TestCase):
+    """Replica router unit tests."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        patcher = patch.object(
+            ReplicaPool, 'choose', return_value='replica1')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route_request(self, replica_reads):
+        token = routers.start_request(replica_reads)
+        self.addCleanup(routers.end_request, token)
+
+    def test_reads_outside_requests_go_to_primary(self):
+        """Test reads outside a request are not routed to replicas."""
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_safe_request_reads_from_replica(self):
+        """Test the reads of a safe request go to a replica."""
+        self.route_request(replica_reads=True)
+
+        self.assertEqual(self.router.db_for_read(Product), 'replica1')
+
+    def test_unsafe_request_reads_from_primary(self):
+        """Test the reads of an unsafe request go to the primary."""
+        self.route_request(replica_reads=False)
+
+        self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_write_pins_request_to_primary(self):
+        """Test the reads after a write go to the primary."""
+        self.route_request(replica_reads=True)
+
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+        self.assertIsNone(self.router.db_for_read(Product))
+
+
+class ReplicaPoolTests(TestCase):
+    """Replica pool health check tests."""
+
+    def test_check_measures_lag(self):
+        """Test the lag query runs on a database that is not a replica."""
+        self.assertTrue(ReplicaPool(['default']).check('default'))
+
+    def test_unhealthy_replicas_fall_back_to_primary(self):
+        """Test no replica is chosen when none is healthy."""
+        pool = ReplicaPool(['replica1', 'replica2'])
+
+        with patch.object(pool, 'check', return_value=False):
+            self.assertIsNone(pool.choose())
+
+    def test_only_healthy_replicas_chosen(self):
+        """Test a replica failing its check is skipped."""
+        pool = ReplicaPool(['replica1', 'replica2'])
+
+        with patch.object(
+            pool, 'check', side_effect=lambda alias: alias == 'replica2',
+        ):
+            self.assertEqual({pool.choose() for _ in range(20)}, {'replica2'})
+
+    @override_settings(REPLICA_CHECK_INTERVAL=60)
+    def test_health_checked_once_per_interval(self):
+        """Test a replica is checked at most once per interval."""
+        pool = ReplicaPool(['replica1'])
+
+        with patch.object(pool, 'check', return_value=True) as check:
+            for _ in range(5):
+                pool.choose()
+
+        check.assert_called_once_with('replica1')
+
+
+class ReplicaPinningMiddlewareTests(TestCase):
+    """Replica pinning middleware tests."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_write_sets_pin_cookie(self):
+        """Test a request that writes pins the client to the primary."""
+        res = self.client.post(reverse('user:register'), {
+            'email': 'email@mail.com', 'password': 'password1234',
+        }, format='json')
+
+        self.assertIn('primary_pinned', res.cookies)
+
+    def test_read_sets_no_pin_cookie(self):
+        """Test a read only request does not pin the client."""
+        get_user_model().objects.create_user(
+            email='email@mail.com', password='password1234')
+
+        res = self.client.get(reverse('product:product-list'))
+
+        self.assertNotIn('primary_pinned', res.cookies)
+
+    def test_pinned_client_reads_from_primary(self):
+        """Test the requests of a pinned client read from the primary."""
+        self.client.cookies['primary_pinned'] = '1'
+        reads = []
+
+        def record(self, model, **hints):
+            reads.append(routers._routing_state.get().replica_reads)
+
+        with patch.object(ReplicaRouter, 'db_for_read', record):
+            self.client.get(reverse('product:product-list'))
+
+        self.assertTrue(reads)
+        self.assertFalse(any(reads))
+
+    def test_write_pins_user_to_primary(self):
+        """Test a user who wrote reads from the primary without a cookie."""
+        user = get_user_model().objects.create_user(
+            email='email@mail.com', password='password1234')
+        self.client.force_authenticate(user)
+
+        res = self.client.patch(reverse('user:manage-user'), {'name': 'name'})
+        self.client.cookies.clear()
+        reads = []
+
+        def record(self, model, **hints):
+            state = routers._routing_state.get()
+            reads.append(state.replica_reads and not state.is_pinned())
+
+        with patch.object(ReplicaRouter, 'db_for_read', record):
+            self.client.get(reverse('product:order-list'))
+
+        self.assertEqual(
+            res['X-Primary-Pin'], str(settings.REPLICA_PIN_SECONDS))
+        self.assertTrue(cache.get(routers.pin_key(user.pk)))
+        self.assertTrue(reads)
+        self.assertFalse(any(reads))
+
+    def test_pin_header_reads_from_primary(self):
+        """Test the requests sending the pin header read from the primary."""
+        reads = []
+
+        def record(self, model, **hints):
+            reads.append(routers._routing_state.get().replica_reads)
+
+        with patch.object(ReplicaRouter, 'db_for_read', record):
+            self.client.get(
+                reverse('product:product-list'), HTTP_X_PRIMARY_PIN='5')
+
+        self.assertTrue(reads)
+        self.assertFalse(any(reads))
+
+    def test_catalog_rebuilt_from_primary(self):
+        """Test the catalog cache is rebuilt from the primary."""
+        reads = []
+
+        def record(self, model, **hints):
+            reads.append(routers._routing_state.get().replica_reads)
+
+        with patch.object(ReplicaRouter, 'db_for_read', record):
+            self.client.get(reverse('product:product-list'))
+
+        self.assertTrue(reads)
+        self.assertFalse(any(reads))
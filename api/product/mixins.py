@@ -0,0 +1,222 @@
+"""
+Product apis viewset mixins.
+"""
+import hashlib
+
+from core.cache import catalog_cache_key, get_or_build
+from core.routers import use_primary
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+
+
+def get_pagination_ordering(view, queryset):
+    """Returns the fields a cursor paginator of the view orders by."""
+    if not isinstance(view.paginator, CursorPagination):
+        return []
+
+    return [
+        field.lstrip('-') for field in
+        view.paginator.get_ordering(view.request, queryset, view)
+    ]
+
+
+class ConditionalGetMixin:
+    """Answers conditional GET requests with a 304.
+
+    The ETag and Last-Modified of a response are computed from the last
+    updated_at and the count of the rows it is made of, in one query,
+    so an unchanged response is neither fetched nor serialized.
+    """
+
+    def get_conditional_queryset(self):
+        """Returns the rows the response is made of."""
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.detail:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        return queryset
+
+    def get_validators(self):
+        """Returns the ETag and Last-Modified timestamp of the response.
+
+        Both are None when there is no row, the response is then never
+        answered with a 304.
+        """
+        state = self.get_conditional_queryset().order_by().aggregate(
+            last_modified=Max('updated_at'),
+            count=Count('pk'),
+        )
+        if not state['count']:
+            return None, None
+
+        request = self.request
+        version = ':'.join([
+            str(request.user.pk),
+            request.get_full_path(),
+            request.accepted_media_type,
+            state['last_modified'].isoformat(),
+            str(state['count']),
+        ])
+        etag = quote_etag(hashlib.sha1(version.encode()).hexdigest())
+
+        return etag, int(state['last_modified'].timestamp())
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """Returns a 304 if the client copy is current, else handler's."""
+        etag, last_modified = self.get_validators()
+
+        return self.finalize_conditional_response(
+            request, etag, last_modified,
+            lambda: handler(request, *args, **kwargs),
+        )
+
+    def finalize_conditional_response(self, request, etag, last_modified,
+                                      get_response):
+        """Sets the validators on the response, or on a 304."""
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = get_response()
+        if etag:
+            response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class CatalogCacheMixin(ConditionalGetMixin):
+    """Serves the responses of the catalog from the catalog cache.
+
+    Responses are cached with their validators by path and query string
+    under the catalog version, so any write to the catalog invalidates
+    them.
+    """
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """Returns the cached response of handler, built on a miss."""
+        def build():
+            # A lagging replica would cache data older than the version.
+            with use_primary():
+                validators = self.get_validators()
+                return validators, handler(request, *args, **kwargs).data
+
+        path = f'{request.accepted_media_type} {request.get_full_path()}'
+        (etag, last_modified), data = get_or_build(
+            catalog_cache_key(path),
+            build,
+            timeout=settings.CATALOG_CACHE_TIMEOUT,
+        )
+
+        return self.finalize_conditional_response(
+            request, etag, last_modified, lambda: Response(data))
+
+
+class ValuesListMixin:
+    """Lists with the values() fast path of the serializer, if it has one.
+
+    See ValuesSerializerMixin, the list is paginated over dicts instead of
+    model instances.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        if not (
+            hasattr(serializer, 'can_read_values')
+            and serializer.can_read_values()
+        ):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = serializer.values(
+            queryset, *get_pagination_ordering(self, queryset))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_values_representation(page))
+
+        return Response(serializer.to_values_representation(rows))
+
+
+class SparseFieldsMixin:
+    """Narrows the fields of the responses and expands their relations.
+
+    Read requests keep only the fields listed by ?fields=, and render the
+    relations listed by ?expand= with the expandable fields of the
+    serializer. The queryset loads only the columns of the fields kept,
+    and the expanded relations with select_related or prefetch_related.
+    """
+
+    def get_field_names(self, param):
+        """Returns the names listed by a query parameter of a read."""
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return set()
+
+        return {
+            name.strip() for name in
+            request.query_params.get(param, '').split(',') if name.strip()
+        }
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_field_names('fields')
+        context['expand'] = self.get_field_names('expand')
+        return context
+
+    def filter_queryset(self, queryset):
+        return self.narrow_queryset(super().filter_queryset(queryset))
+
+    def narrow_queryset(self, queryset):
+        """Loads only the columns and relations the serializer reads."""
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+
+        serializer = self.get_serializer()
+        opts = queryset.model._meta
+        field_sources = getattr(serializer.Meta, 'field_sources', {})
+        columns = {opts.pk.name, *get_pagination_ordering(self, queryset)}
+        columns_known = True
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in field_sources:
+                columns.update(field_sources[name])
+                continue
+            try:
+                model_field = opts.get_field(field.source)
+            except FieldDoesNotExist:
+                model_field = None
+            concrete = model_field is not None and model_field.concrete
+
+            if isinstance(field, BaseSerializer) and concrete:
+                queryset = queryset.select_related(field.source)
+            elif isinstance(field, BaseSerializer):
+                queryset = queryset.prefetch_related(field.source)
+                continue
+            if concrete:
+                columns.add(field.source)
+            else:
+                columns_known = False
+
+        return queryset.only(*columns) if columns_known else queryset
@@ -0,0 +1,224 @@
+"""
+Product apis pagination classes.
+"""
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import BooleanField, F, Q, Value
+from django.utils import timezone
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination ordered by the primary key, newest first."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-id'
+
+
+class KeysetCursorPagination(IdCursorPagination):
+    """Keyset pagination on the requested ordering, ties broken by id.
+
+    DRF's cursor keys on the first ordering field only and pages through
+    ties by offset, which repeats or skips rows once they change. The
+    position here holds every ordering field, so it is unique and pages
+    are selected by a composite keyset.
+    """
+    tie_breaker = 'id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        fields = [order.lstrip('-') for order in ordering]
+        if self.tie_breaker in fields or 'pk' in fields:
+            return ordering
+
+        prefix = '-' if ordering[-1].startswith('-') else ''
+        return (*ordering, prefix + self.tie_breaker)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            name = order.lstrip('-')
+            value = (instance[name] if isinstance(instance, dict)
+                     else getattr(instance, name))
+            values.append(str(value))
+
+        return json.dumps(values)
+
+    def get_keyset_filter(self, position, reverse):
+        """Returns the filter of the rows after position."""
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        keyset = Q()
+        equal = Q()
+        for order, value in zip(self.ordering, values):
+            field = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            keyset |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+
+        return keyset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor else None
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                order[1:] if order.startswith('-') else '-' + order
+                for order in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+        following = self._get_position_from_instance(
+            results[-1], self.ordering) if has_following else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_following
+            self.next_position = position
+            self.previous_position = following
+        else:
+            self.has_next = has_following
+            self.has_previous = position is not None
+            self.next_position = following
+            self.previous_position = position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class ReviewCursorPagination(IdCursorPagination):
+    """Keyset pagination of reviews, newest first."""
+    ordering = '-created_at'
+
+
+class SearchPagination(PageNumberPagination):
+    """Page number pagination for relevance ranked results."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class ChangesPagination:
+    """Keyset pagination of the catalog changes since a token.
+
+    Products and tombstones are paged together by change time and id, the
+    token encodes the last change returned. Changes younger than
+    CATALOG_CHANGES_SETTLE_TIME are held back, so that a transaction
+    committing late does not slip behind a token already handed out.
+    """
+    page_size = 500
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    token_query_param = 'since'
+    invalid_token_message = 'Invalid since token.'
+
+    def paginate_changes(self, products, tombstones, request):
+        """Returns the changed product ids and the deleted product ids."""
+        page_size = self.get_page_size(request)
+        since = self.decode_token(
+            request.query_params.get(self.token_query_param))
+        until = timezone.now() - timedelta(
+            seconds=settings.CATALOG_CHANGES_SETTLE_TIME)
+
+        products = self.changes(products.annotate(
+            changed_at=F('updated_at'),
+            key=F('id'),
+            deleted=Value(False, output_field=BooleanField()),
+        ), since, until)
+        tombstones = self.changes(tombstones.annotate(
+            changed_at=F('deleted_at'),
+            key=F('product_id'),
+            deleted=Value(True, output_field=BooleanField()),
+        ), since, until)
+        changes = list(products.union(tombstones, all=True).order_by(
+            'changed_at', 'key')[:page_size + 1])
+
+        self.has_more = len(changes) > page_size
+        changes = changes[:page_size]
+        self.token = self.encode_token(changes[-1][:2]) if changes else (
+            request.query_params.get(self.token_query_param))
+
+        return (
+            [key for changed_at, key, deleted in changes if not deleted],
+            [key for changed_at, key, deleted in changes if deleted],
+        )
+
+    def changes(self, queryset, since, until):
+        """Keeps the changes after the since token, up to until."""
+        queryset = queryset.filter(changed_at__lt=until)
+        if since is not None:
+            changed_at, key = since
+            queryset = queryset.filter(changed_at__gte=changed_at).exclude(
+                changed_at=changed_at, key__lte=key)
+
+        return queryset.order_by().values_list('changed_at', 'key', 'deleted')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def encode_token(self, change):
+        changed_at, key = change
+        token = f'{changed_at.isoformat()}|{key}'
+
+        return urlsafe_b64encode(token.encode('ascii')).decode('ascii')
+
+    def decode_token(self, token):
+        if not token:
+            return None
+        try:
+            changed_at, key = urlsafe_b64decode(
+                token.encode('ascii')).decode('ascii').split('|')
+            changed_at = datetime.fromisoformat(changed_at)
+            return changed_at, int(key)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_token_message)
+
+    def get_paginated_response(self, data, deleted):
+        return Response(OrderedDict([
+            ('since', self.token),
+            ('more', self.has_more),
+            ('results', data),
+            ('deleted', deleted),
+        ]))
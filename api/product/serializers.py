@@ -3,28 +3,247 @@ Product serializers.
 """
 
 from core.models import (
+    ORDER_PRICE_MAX,
+    RATING_STARS,
     Product,
     Review,
     Order,
-    OrderItem)
+    OrderItem,
+    OrderJob,
+    rating_count_field)
+
+from django.db import transaction
 
 from rest_framework import serializers
 
+from user.serializers import UserSummarySerializer
+
+
+class DynamicFieldsMixin:
+    """Narrows the fields of a serializer and expands its relations.
+
+    Only the fields named in the 'fields' context are kept, and the
+    relations named in the 'expand' context are rendered by the
+    serializers of Meta.expandable_fields. Meta.field_sources names the
+    model fields read by the fields that are not model fields.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.context.get('expand', ())
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name, (serializer_class, options) in expandable.items():
+            if name in expand:
+                self.fields[name] = serializer_class(read_only=True, **options)
+
+        fields = self.context.get('fields')
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ValuesSerializerMixin:
+    """Opt-in read fast path of a model serializer.
+
+    Rows are read with values() for the declared fields and formatted
+    directly by the fields, without building model instances. Only
+    fields with a plain source are supported, the output is the same as
+    to_representation of the instances.
+    """
+
+    def get_value_formatters(self):
+        """Returns the name, source and formatter of the read fields."""
+        formatters = []
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if (
+                isinstance(field, serializers.BaseSerializer)
+                or not field.source_attrs or len(field.source_attrs) > 1
+            ):
+                raise TypeError(
+                    f'{type(self).__name__}.{name} has no plain source, '
+                    f'it cannot be read from values().')
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                formatter = (field.pk_field.to_representation
+                             if field.pk_field else None)
+            elif isinstance(field, serializers.ReadOnlyField):
+                formatter = None
+            else:
+                formatter = field.to_representation
+            formatters.append((name, field.source, formatter))
+
+        return formatters
+
+    def can_read_values(self):
+        """Returns whether every read field can be read from values()."""
+        try:
+            self.get_value_formatters()
+        except TypeError:
+            return False
+
+        return True
+
+    def values(self, queryset, *extra):
+        """Returns queryset.values() for the read fields and extra."""
+        sources = [source for _, source, _ in self.get_value_formatters()]
+
+        return queryset.values(*sources, *extra)
+
+    def to_values_representation(self, rows):
+        """Formats rows read by values() like the instances would be."""
+        formatters = self.get_value_formatters()
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, formatter in formatters:
+                value = row[source]
+                if value is not None and formatter is not None:
+                    value = formatter(value)
+                item[name] = value
+            data.append(item)
+
+        return data
+
+
+class ProductSerializer(DynamicFieldsMixin,
+                        ValuesSerializerMixin,
+                        serializers.ModelSerializer):
+    """Product serializer."""
+
+    class Meta:
+        model = Product
+        fields = ['id', 'title', 'price', 'rating_avg', 'rating_count']
+        read_only_fields = ['rating_avg', 'rating_count']
+        expandable_fields = {
+            'user': (UserSummarySerializer, {}),
+        }
+
+
+class ReviewSerializer(DynamicFieldsMixin,
+                       ValuesSerializerMixin,
+                       serializers.ModelSerializer):
+    """Review serializer."""
+
+    class Meta:
+        model = Review
+        fields = ['id', 'product', 'name', 'rating']
+        expandable_fields = {
+            'product': (ProductSerializer, {}),
+            'user': (UserSummarySerializer, {}),
+        }
+
+    def validate(self, attrs):
+        """Requires the product on create, and keeps it on update."""
+        if self.instance is not None:
+            attrs.pop('product', None)
+        elif attrs.get('product') is None:
+            raise serializers.ValidationError(
+                {'product': ['This field is required.']})
+
+        return attrs
+
+
+class ReviewDetailSerializer(ReviewSerializer):
+    """Review detail serializer"""
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ['comment']
+
+
+class ProductDetailSerializer(ProductSerializer):
+    """Product detail serializer.
+
+    The newest reviews are embedded only when 'reviews' is in the
+    'include' context, and are read from the latest_reviews of the
+    product, set by the view.
+    """
+    rating_histogram = serializers.ReadOnlyField()
+    image_variants = serializers.SerializerMethodField()
+    reviews = ReviewDetailSerializer(
+        many=True,
+        read_only=True,
+        source='latest_reviews',
+    )
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + [
+            'description',
+            'image',
+            'image_variants',
+            'rating_histogram',
+            'reviews',
+        ]
+        field_sources = {
+            'image_variants': ['image', 'image_variants'],
+            'rating_histogram': [
+                rating_count_field(star) for star in RATING_STARS],
+            'reviews': [],
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'reviews' not in self.context.get('include', ()):
+            self.fields.pop('reviews', None)
+
+    def get_image_variants(self, product):
+        """Returns the urls of the resized variants of the image."""
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in product.image_variants.items():
+            url = product.image.storage.url(name)
+            urls[variant] = request.build_absolute_uri(url) if request else url
+
+        return urls
+
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(DynamicFieldsMixin,
+                          ValuesSerializerMixin,
+                          serializers.ModelSerializer):
     """OrderItem Serializer."""
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'name', 'price', 'product', 'order']
+        fields = ['id', 'name', 'price', 'quantity', 'product', 'order']
+        read_only_fields = ['price']
+        expandable_fields = {
+            'product': (ProductSerializer, {}),
+        }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        orders = self.context.get('orders')
+        if orders is not None and 'order' in self.fields:
+            self.fields['order'].queryset = orders
 
-class OrderSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        """Copies the price of the product to the item."""
+        product = attrs.get('product')
+        if product is not None:
+            attrs['price'] = product.price
+        elif self.instance is None:
+            raise serializers.ValidationError(
+                {'product': ['This field is required.']})
+
+        return attrs
+
+
+class OrderSerializer(DynamicFieldsMixin,
+                      ValuesSerializerMixin,
+                      serializers.ModelSerializer):
     """Order serializer."""
 
     class Meta:
         model = Order
         fields = ['id', 'price', 'done']
+        read_only_fields = ['price']
+        expandable_fields = {
+            'user': (UserSummarySerializer, {}),
+            'items': (OrderItemSerializer, {
+                'source': 'orderitem_set',
+                'many': True,
+            }),
+        }
 
 
 class OrderDetailSerializer(OrderSerializer):
@@ -34,31 +253,115 @@ class OrderDetailSerializer(OrderSerializer):
         fields = OrderSerializer.Meta.fields + ['processed_at', 'created_at']
 
 
-class ReviewSerializer(serializers.ModelSerializer):
-    """Review serializer."""
+class ProductBatchSerializer(serializers.Serializer):
+    """Batch fetch of products request serializer."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=500,
+    )
+
+
+class ProductBulkDeleteSerializer(serializers.Serializer):
+    """Bulk delete of products request serializer."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=50000,
+    )
+
+
+class ProductImageSerializer(serializers.ModelSerializer):
+    """Product image serializer."""
 
     class Meta:
-        model = Review
-        fields = ['id', 'name', 'rating']
+        model = Product
+        fields = ['id', 'image']
+        read_only_fields = ['id', 'image']
 
 
-class ReviewDetailSerializer(ReviewSerializer):
-    """Review detail serializer"""
+class CheckoutItemSerializer(serializers.Serializer):
+    """Checkout cart line serializer."""
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(
+        min_value=1, max_value=1000, default=1)
 
-    class Meta(ReviewSerializer.Meta):
-        fields = ReviewSerializer.Meta.fields + ['comment']
 
+class CheckoutSerializer(serializers.Serializer):
+    """Checkout serializer, creates an order from a cart."""
+    max_items = 500
 
-class ProductSerializer(serializers.ModelSerializer):
-    """Product serializer."""
+    items = CheckoutItemSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        """Checks the cart size and that every product exists."""
+        if len(items) > self.max_items:
+            raise serializers.ValidationError(
+                f'A cart holds at most {self.max_items} items.')
+
+        ids = {item['product'] for item in items}
+        products = Product.objects.only('id', 'title', 'price').in_bulk(ids)
+        missing = sorted(ids - products.keys())
+        if missing:
+            raise serializers.ValidationError(
+                f'Unknown products: {missing}.')
+
+        return [
+            dict(item, product=products[item['product']]) for item in items
+        ]
+
+    def validate(self, attrs):
+        """Checks the order price stays within ORDER_PRICE_MAX."""
+        total = sum(
+            item['product'].price * item['quantity'] for item in attrs['items']
+        )
+        if total > ORDER_PRICE_MAX:
+            raise serializers.ValidationError(
+                f'The order price cannot exceed {ORDER_PRICE_MAX}.')
+
+        return attrs
+
+    def create(self, validated_data):
+        """Creates the order and its items in one transaction."""
+        items = [
+            OrderItem(
+                product=item['product'],
+                name=item['product'].title or '',
+                price=item['product'].price,
+                quantity=item['quantity'],
+            )
+            for item in validated_data['items']
+        ]
+        with transaction.atomic():
+            order = Order.objects.create(
+                user=validated_data['user'],
+                price=sum(item.price * item.quantity for item in items),
+            )
+            for item in items:
+                item.order = order
+            OrderItem.objects.bulk_create(items)
+
+        return order
+
+
+class OrderJobSerializer(serializers.ModelSerializer):
+    """Order processing job serializer."""
 
     class Meta:
-        model = Product
-        fields = ['id', 'title', 'price']
+        model = OrderJob
+        fields = ['id', 'order', 'status', 'attempts', 'created_at']
+        read_only_fields = fields
 
 
-class ProductDetailSerializer(ProductSerializer):
-    """Product detail serializer."""
+class ProcessOrderSerializer(serializers.Serializer):
+    """Process order request serializer."""
+    order = serializers.IntegerField()
 
-    class Meta(ProductSerializer.Meta):
-        fields = ProductSerializer.Meta.fields + ['description']
+
+class ProcessOrdersSerializer(serializers.Serializer):
+    """Process orders in bulk request serializer."""
+    orders = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=500,
+    )
@@ -1,8 +1,13 @@
 """
 Order APIs unit tests.
 """
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
 
+import msgpack
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -11,19 +16,26 @@ from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.renderers import MessagePackRenderer
+
 
 from core.models import (
+    IdempotencyKey,
     Order,
     Product,
-    OrderItem)
+    OrderItem,
+    OrderJob)
 from product.serializers import (
     OrderSerializer,
-    OrderDetailSerializer)
+    OrderDetailSerializer,
+    OrderJobSerializer)
 
 
 ORDERS_URL = reverse('product:order-list')
 ORDERS_PRIVATE_URL = reverse('product:orderprivate-list')
 PROCESS_ORDER = reverse('product:processorder')
+PROCESS_ORDERS = reverse('product:processorders')
+CHECKOUT_URL = reverse('product:checkout')
 
 
 def order_detail_url(order_id):
@@ -117,11 +129,11 @@ class PrivateOrderTests(TestCase):
         res = self.client.get(ORDERS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        orders = Order.objects.filter(user=self.user)
+        orders = Order.objects.filter(user=self.user).order_by('-id')
         self.assertEqual(orders.count(), 2)
 
         serializer = OrderSerializer(orders, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_create_order(self):
         """Testing the creation of an order."""
@@ -139,6 +151,7 @@ class PrivateOrderTests(TestCase):
         order = orders[0]
         serializer = OrderDetailSerializer(order)
         self.assertEqual(res.data, serializer.data)
+        self.assertEqual(order.price, Decimal('0'))
 
     def test_create_order_for_other_user_error(self):
         """Testing the creation of an order for another user returns error"""
@@ -192,15 +205,327 @@ class PrivateOrderTests(TestCase):
             'order': order.id
         }
         res = self.client.post(PROCESS_ORDER, payload)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+        job = OrderJob.objects.get(pk=res.data['id'])
+        self.assertEqual(res.data, OrderJobSerializer(job).data)
+        self.assertEqual(job.order, order)
+        self.assertEqual(job.status, OrderJob.Status.PENDING)
+
+        call_command('process_order_jobs', once=True, stdout=StringIO())
+
+        order.refresh_from_db()
+        self.assertTrue(order.done)
+        self.assertIsNotNone(order.processed_at)
+
+    def test_process_order_queued_once(self):
+        """Test processing a queued order again reuses its job."""
+        order = create_order(user=self.user)
+        res = self.client.post(PROCESS_ORDER, {'order': order.id})
+
+        retry = self.client.post(PROCESS_ORDER, {'order': order.id})
+
+        self.assertEqual(retry.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(retry.data['id'], res.data['id'])
+        self.assertEqual(OrderJob.objects.count(), 1)
+
+    def test_process_order_done(self):
+        """Test processing a done order returns it without a new job."""
+        order = create_order(user=self.user, done=True)
+
+        res = self.client.post(PROCESS_ORDER, {'order': order.id})
+
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, OrderSerializer(order).data)
+        self.assertFalse(OrderJob.objects.exists())
 
-        orders = Order.objects.filter(pk=res.data['id'])
-        self.assertEqual(orders.count(), 1)
-        order = orders[0]
+    def test_process_order_twice(self):
+        """Test processing an order again keeps its processed_at."""
+        order = create_order(user=self.user, processed_at=None)
+        Order.objects.filter(pk=order.id).process()
+        order.refresh_from_db()
+        processed_at = order.processed_at
 
-        serializer = OrderSerializer(order)
+        Order.objects.filter(pk=order.id).process()
 
-        self.assertEqual(res.data, serializer.data)
+        order.refresh_from_db()
+        self.assertTrue(order.done)
+        self.assertEqual(order.processed_at, processed_at)
+
+    def test_process_order_other_user_error(self):
+        """Test processing another user's order returns 404."""
+        other_user = create_user(email='other@mail.com')
+        order = create_order(user=other_user)
+
+        res = self.client.post(PROCESS_ORDER, {'order': order.id})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(OrderJob.objects.exists())
+
+    def test_process_order_missing_id(self):
+        """Test processing without an order id returns 400."""
+        res = self.client.post(PROCESS_ORDER, {})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_process_order_idempotency_key(self):
+        """Test a retried request replays the stored response."""
+        order = create_order(user=self.user)
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'key-1'}
+        res = self.client.post(PROCESS_ORDER, {'order': order.id}, **headers)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        OrderJob.objects.all().delete()
+
+        retry = self.client.post(PROCESS_ORDER, {'order': order.id},
+                                 **headers)
+
+        self.assertEqual(retry.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(retry.json(), res.json())
+        self.assertFalse(OrderJob.objects.exists())
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_process_order_idempotency_key_other_request(self):
+        """Test a key reused for another request returns 422."""
+        order = create_order(user=self.user)
+        other_order = create_order(user=self.user)
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'key-1'}
+        self.client.post(PROCESS_ORDER, {'order': order.id}, **headers)
+
+        res = self.client.post(PROCESS_ORDER, {'order': other_order.id},
+                               **headers)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(OrderJob.objects.filter(order=other_order).exists())
+
+    def test_process_order_idempotency_key_scoped(self):
+        """Test keys are scoped to the user and the path."""
+        order = create_order(user=self.user)
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'key-1'}
+        self.client.post(PROCESS_ORDER, {'order': order.id}, **headers)
+
+        record = IdempotencyKey.objects.get()
+        self.assertEqual(record.user, self.user)
+        self.assertEqual(record.path, PROCESS_ORDER)
+        self.assertEqual(len(record.request_hash), 64)
+
+    def test_process_order_idempotency_key_expired(self):
+        """Test a request retried after the key expired is processed."""
+        order = create_order(user=self.user)
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'key-1'}
+        self.client.post(PROCESS_ORDER, {'order': order.id}, **headers)
+        OrderJob.objects.all().delete()
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - timedelta(days=2))
+
+        res = self.client.post(PROCESS_ORDER, {'order': order.id},
+                               **headers)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(OrderJob.objects.filter(order=order).exists())
+        self.assertFalse(IdempotencyKey.objects.get().is_expired())
+
+    def test_process_orders(self):
+        """Test queuing the processing of a list of orders at once."""
+        orders = [create_order(user=self.user) for i in range(3)]
+        done_order = create_order(user=self.user, done=True)
+        other_order = create_order(user=create_user(email='other@mail.com'))
+        ids = [order.id for order in orders] + [done_order.id, other_order.id]
+
+        res = self.client.post(PROCESS_ORDERS, {'orders': ids},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual([job['order'] for job in res.data], ids[:3])
+
+        call_command('process_order_jobs', once=True, stdout=StringIO())
+
+        done = Order.objects.filter(done=True).values_list('id', flat=True)
+        self.assertEqual(sorted(done), ids[:4])
+
+
+class SparseOrderTests(TestCase):
+    """Sparse fields and expansion of the order apis tests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def test_orders_expand_items(self):
+        """Test expanding the items of orders without a query per order."""
+        product = create_product(user=self.user)
+        for _ in range(3):
+            order = create_order(user=self.user)
+            create_orderItem(order=order, product=product)
+            create_orderItem(order=order, product=product)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(ORDERS_URL, {'expand': 'items,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for order in res.data['results']:
+            self.assertEqual(len(order['items']), 2)
+            self.assertEqual(order['user']['id'], self.user.id)
+
+    def test_order_detail_fields(self):
+        """Test narrowing the fields of an order."""
+        order = create_order(user=self.user)
+
+        res = self.client.get(order_detail_url(order.id),
+                              {'fields': 'id,created_at'})
+
+        self.assertEqual(res.data, {
+            'id': order.id,
+            'created_at': OrderDetailSerializer(order).data['created_at'],
+        })
+
+
+class ConditionalOrderTests(TestCase):
+    """Conditional GET of the order apis tests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.order = create_order(user=self.user)
+
+    def test_orders_not_modified(self):
+        """Test an unchanged order list is answered with a 304."""
+        res = self.client.get(ORDERS_URL)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ORDERS_URL,
+                                  HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(res.content)
+
+    def test_orders_modified_since(self):
+        """Test If-Modified-Since is answered from the last update."""
+        res = self.client.get(ORDERS_URL)
+
+        res = self.client.get(ORDERS_URL,
+                              HTTP_IF_MODIFIED_SINCE=res['Last-Modified'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_orders_changed(self):
+        """Test the ETag changes when an item updates the order price."""
+        etag = self.client.get(ORDERS_URL)['ETag']
+        product = Product.objects.create(user=self.user, title='product',
+                                         price=Decimal('1.00'))
+        self.client.post(reverse('product:orderitem-list'), {
+            'product': product.id,
+            'order': self.order.id,
+            'name': 'item',
+            'price': '2.00',
+        })
+
+        res = self.client.get(ORDERS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_order_detail_not_modified(self):
+        """Test an unchanged order is answered with a 304."""
+        url = order_detail_url(self.order.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_order_detail_other_user(self):
+        """Test another user's order is not found, conditional or not."""
+        order = create_order(user=create_user(email='other@mail.com'))
+
+        res = self.client.get(order_detail_url(order.id),
+                              HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CheckoutTests(TestCase):
+    """Checkout test cases."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+
+        self.client.force_authenticate(self.user)
+
+    def test_checkout(self):
+        """Test a cart is turned into an order with its items."""
+        product1 = create_product(user=self.user, price=Decimal('2.50'))
+        product2 = create_product(user=self.user, title='product title 2')
+        payload = {
+            'items': [
+                {'product': product1.id, 'quantity': 3},
+                {'product': product2.id},
+            ]
+        }
+        res = self.client.post(CHECKOUT_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        order = Order.objects.get(pk=res.data['id'])
+        self.assertEqual(order.user, self.user)
+        self.assertEqual(order.price, Decimal('13.00'))
+        self.assertEqual(res.data, OrderDetailSerializer(order).data)
+
+        items = order.orderitem_set.order_by('id')
+        self.assertEqual(
+            [(i.product, i.name, i.price, i.quantity) for i in items],
+            [
+                (product1, product1.title, Decimal('2.50'), 3),
+                (product2, product2.title, Decimal('5.50'), 1),
+            ],
+        )
+
+    def test_checkout_unknown_product(self):
+        """Test a cart with an unknown product creates nothing."""
+        product = create_product(user=self.user)
+        payload = {
+            'items': [
+                {'product': product.id, 'quantity': 1},
+                {'product': product.id + 1, 'quantity': 1},
+            ]
+        }
+        res = self.client.post(CHECKOUT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_checkout_over_price_max(self):
+        """Test a cart over the max order price creates nothing."""
+        product = create_product(user=self.user, price=Decimal('999.00'))
+        payload = {'items': [{'product': product.id, 'quantity': 101}]}
+
+        res = self.client.post(CHECKOUT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_quantity_too_large(self):
+        """Test a cart line over the max quantity returns an error."""
+        product = create_product(user=self.user, price=Decimal('0.01'))
+        payload = {'items': [{'product': product.id, 'quantity': 1001}]}
+
+        res = self.client.post(CHECKOUT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_empty_cart(self):
+        """Test an empty cart returns an error."""
+        res = self.client.post(CHECKOUT_URL, {'items': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
 
 
 class PrivateAdminOrderTests(TestCase):
@@ -224,7 +549,32 @@ class PrivateAdminOrderTests(TestCase):
         res = self.client.get(ORDERS_PRIVATE_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        orders = Order.objects.all()
+        orders = Order.objects.order_by('-id')
         serializer = OrderSerializer(orders, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_retrieve_orders_msgpack(self):
+        """Test listing orders as MessagePack."""
+        create_order(user=create_user(), price=Decimal('12.34'))
+
+        res = self.client.get(ORDERS_PRIVATE_URL,
+                              HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(res.content)
+        self.assertEqual(data['results'][0]['price'], '12.34')
+
+    def test_update_order_msgpack(self):
+        """Test updating an order from a MessagePack body."""
+        order = create_order(user=create_user())
+        url = reverse('product:orderprivate-detail', args=[order.id])
+        body = MessagePackRenderer().render({'done': True})
+
+        res = self.client.patch(url, body,
+                                content_type='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        order.refresh_from_db()
+        self.assertTrue(order.done)
@@ -15,6 +15,7 @@ from rest_framework.test import APIClient
 from rest_framework import status
 
 from core.models import (
+    Order,
     Product,
     OrderItem,)
 from product.serializers import OrderItemSerializer
@@ -99,11 +100,13 @@ class PrivateOrderItemAPITest(TestCase):
         res = self.client.get(ORDERITEMS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        orderItems = OrderItem.objects.filter(order__user=self.user)
+        orderItems = OrderItem.objects.filter(
+            order__user=self.user
+        ).order_by('-id')
         self.assertEqual(orderItems.count(), 2)
         serializer = OrderItemSerializer(orderItems, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_orderitem_user(self):
         """Test retrieving one orderitem for user."""
@@ -144,6 +147,78 @@ class PrivateOrderItemAPITest(TestCase):
 
         self.assertEqual(res.data, serializer.data)
 
+    def test_create_orderitem_updates_order_price(self):
+        """Test adding an item sets the order price to the items total."""
+        product = create_product(user=self.user)
+        order = create_order(user=self.user, price=Decimal('0'))
+        create_orderItem(order=order, product=product, price=Decimal('2.25'))
+
+        payload = {
+            'product': product.id,
+            'order': order.id,
+            'name': 'orderitem default name.',
+            'price': Decimal('5.50'),
+        }
+        res = self.client.post(ORDERITEMS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        order.refresh_from_db()
+        self.assertEqual(order.price, Decimal('7.75'))
+
+    def test_create_orderitem_other_user_order_error(self):
+        """Test an item cannot be added to the order of another user."""
+        product = create_product(user=self.user)
+        other_order = create_order(
+            user=create_user(email='other@mail.com'), price=Decimal('0'))
+
+        res = self.client.post(ORDERITEMS_URL, {
+            'product': product.id,
+            'order': other_order.id,
+            'name': 'orderitem default name.',
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('order', res.data)
+        other_order.refresh_from_db()
+        self.assertEqual(other_order.price, Decimal('0'))
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_create_orderitem_uses_product_price(self):
+        """Test the price of an item is copied from its product."""
+        product = create_product(user=self.user, price=Decimal('4.00'))
+        order = create_order(user=self.user)
+
+        res = self.client.post(ORDERITEMS_URL, {
+            'product': product.id,
+            'order': order.id,
+            'name': 'orderitem default name.',
+            'price': Decimal('0.01'),
+            'quantity': 3,
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(res.data['price']), Decimal('4.00'))
+        order.refresh_from_db()
+        self.assertEqual(order.price, Decimal('12.00'))
+
+    def test_create_orderitem_over_price_max_error(self):
+        """Test an item taking the order price over its max fails."""
+        product = create_product(user=self.user, price=Decimal('999.00'))
+        order = create_order(user=self.user, price=Decimal('0'))
+
+        res = self.client.post(ORDERITEMS_URL, {
+            'product': product.id,
+            'order': order.id,
+            'name': 'orderitem default name.',
+            'quantity': 101,
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('quantity', res.data)
+        self.assertFalse(OrderItem.objects.exists())
+        order.refresh_from_db()
+        self.assertEqual(order.price, Decimal('0'))
+
     def test_update_orderitem_error(self):
         """Test update orderitem user error."""
         product = create_product(user=self.user)
@@ -188,10 +263,10 @@ class PrivateAdminOrderItemAPITest(TestCase):
         res = self.client.get(ORDERITEMS_PRIVATE_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        orderItems = OrderItem.objects.all()
+        orderItems = OrderItem.objects.order_by('-id')
         serializer = OrderItemSerializer(orderItems, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_delete_orderitem(self):
         """Testing the deletion of an orderitem."""
@@ -204,3 +279,47 @@ class PrivateAdminOrderItemAPITest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(OrderItem.objects.filter(pk=orderitem.id).exists())
+
+    def test_update_orderitem_updates_order_price(self):
+        """Test changing an item quantity updates the order price."""
+        product = create_product(user=self.user)
+        order = create_order(user=self.user)
+        orderitem = create_orderItem(order=order, product=product)
+        create_orderItem(order=order, product=product, price=Decimal('1'))
+        url = orderitem_private_detail_url(orderitem.id)
+
+        res = self.client.patch(url, {'quantity': 3}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        order.refresh_from_db()
+        self.assertEqual(order.price, Decimal('17.50'))
+
+    def test_move_orderitem_updates_order_prices(self):
+        """Test moving an item to another order updates both prices."""
+        product = create_product(user=self.user)
+        order = create_order(user=self.user)
+        other_order = create_order(user=self.user)
+        orderitem = create_orderItem(order=order, product=product)
+        url = orderitem_private_detail_url(orderitem.id)
+
+        res = self.client.patch(url, {'order': other_order.id},
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        prices = dict(Order.objects.values_list('id', 'price'))
+        self.assertEqual(prices[order.id], Decimal('0'))
+        self.assertEqual(prices[other_order.id], Decimal('5.50'))
+
+    def test_delete_orderitem_updates_order_price(self):
+        """Test deleting an item removes its price from the order."""
+        product = create_product(user=self.user)
+        order = create_order(user=self.user)
+        orderitem = create_orderItem(order=order, product=product)
+        create_orderItem(order=order, product=product, price=Decimal('1'))
+        url = orderitem_private_detail_url(orderitem.id)
+
+        res = self.client.delete(url)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        order.refresh_from_db()
+        self.assertEqual(order.price, Decimal('1.00'))
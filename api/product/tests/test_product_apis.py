@@ -1,16 +1,36 @@
 """
 Product APIs unit tests.
 """
+import os
+import shutil
+import tempfile
 from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from PIL import Image
 
 from product.serializers import (
     ProductSerializer,
-    ProductDetailSerializer
+    ProductDetailSerializer,
+    ReviewDetailSerializer,
 )
 
-from core.models import Product
+from product.views import ProductPrivateViewSet
+
+from core.images import ImageTooLarge, save_product_image
+from core.models import (
+    Product,
+    ProductImageJob,
+    ProductTombstone,
+    Review,
+)
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
@@ -22,6 +42,12 @@ PRODUCTS_URL = reverse('product:product-list')
 
 PRODUCTS_PRIVATE_URL = reverse('product:privateproduct-list')
 
+PRODUCT_CHANGES_URL = reverse('product:product-changes')
+
+PRODUCT_BATCH_URL = reverse('product:product-batch')
+
+PRODUCTS_BULK_URL = reverse('product:privateproduct-bulk')
+
 
 def create_product(user, **params):
     """Creates and returns a product."""
@@ -48,6 +74,24 @@ def product_detail_url(product_id):
     return reverse('product:product-detail', args=[product_id])
 
 
+def product_reviews_url(product_id):
+    """Returns the product reviews url."""
+    return reverse('product:product-reviews', args=[product_id])
+
+
+def upload_image_url(product_id):
+    """Returns the product image upload url."""
+    return reverse('product:privateproduct-upload-image', args=[product_id])
+
+
+def image_bytes(size=(800, 400), format='JPEG'):
+    """Returns an encoded image."""
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format=format)
+
+    return buffer.getvalue()
+
+
 def product_detail_private_url(product_id):
     """Returns the product detail private url."""
     return reverse('product:privateproduct-detail', args=[product_id])
@@ -67,11 +111,109 @@ class PublicProductApiTest(TestCase):
 
         res = self.client.get(PRODUCTS_URL)
 
-        products = Product.objects.all()
+        products = Product.objects.order_by('-id')
         serializer = ProductSerializer(products, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_retrieve_products_paginated(self):
+        """Test the product list is split in pages by cursor."""
+        user = create_user()
+        for i in range(5):
+            create_product(user=user, title=f'product {i}')
+
+        res = self.client.get(PRODUCTS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNone(res.data['previous'])
+
+        seen = [p['id'] for p in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [p['id'] for p in res.data['results']]
+
+        expected = Product.objects.order_by('-id').values_list(
+            'id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_retrieve_products_by_rating(self):
+        """Test sorting the product list by average rating."""
+        user = create_user()
+        low = create_product(user=user, title='low')
+        high = create_product(user=user, title='high')
+        Product.objects.filter(pk=low.pk).apply_rating(2)
+        Product.objects.filter(pk=high.pk).apply_rating(5)
+
+        res = self.client.get(PRODUCTS_URL, {'ordering': '-rating_avg'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [p['id'] for p in res.data['results']]
+        self.assertEqual(ids, [high.id, low.id])
+        self.assertEqual(res.data['results'][0]['rating_avg'], '5.00')
+
+    def test_page_products_by_rating_with_ties(self):
+        """Test paging products sorted by a tied rating skips no row."""
+        user = create_user()
+        for index in range(60):
+            product = create_product(user=user, title=f'product {index}')
+            Product.objects.filter(pk=product.pk).apply_rating(index % 3 + 3)
+
+        ids = []
+        params = {'ordering': '-rating_avg', 'page_size': 7}
+        res = self.client.get(PRODUCTS_URL, params)
+        while True:
+            ids.extend(p['id'] for p in res.data['results'])
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(ids), 60)
+        self.assertEqual(len(set(ids)), 60)
+        ratings = dict(Product.objects.values_list('id', 'rating_avg'))
+        self.assertEqual(
+            ids, sorted(ids, key=lambda pk: (ratings[pk], pk), reverse=True))
+
+        previous = self.client.get(res.data['previous'])
+        self.assertEqual(
+            [p['id'] for p in previous.data['results']], ids[-11:-4])
+
+    def test_search_products(self):
+        """Test searching products returns the ranked matches."""
+        user = create_user()
+        shoes = create_product(
+            user=user,
+            title='Running shoes',
+            description='Light shoes for running.',
+        )
+        socks = create_product(
+            user=user,
+            title='Socks',
+            description='Socks to wear with your running shoes.',
+        )
+        create_product(user=user, title='Jacket', description='Warm.')
+        Product.objects.update_search_vector()
+
+        res = self.client.get(PRODUCTS_URL, {'q': 'shoes'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 2)
+        ids = [p['id'] for p in res.data['results']]
+        self.assertEqual(ids, [shoes.id, socks.id])
+
+    def test_search_products_typo(self):
+        """Test searching with a misspelled term falls back to trigrams."""
+        user = create_user()
+        shoes = create_product(user=user, title='Shoes')
+        create_product(user=user, title='Jacket')
+        Product.objects.update_search_vector()
+
+        res = self.client.get(PRODUCTS_URL, {'q': 'shoos'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [p['id'] for p in res.data['results']]
+        self.assertEqual(ids, [shoes.id])
 
     def test_retrieve_detail_product(self):
         """Test retrieving a single product."""
@@ -85,6 +227,56 @@ class PublicProductApiTest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
+        self.assertNotIn('reviews', res.data)
+
+    def test_retrieve_detail_product_include_reviews(self):
+        """Test embedding the newest reviews in a single product."""
+        user = create_user()
+        product = create_product(user=user)
+        other_product = create_product(user=user, title='other')
+        for i in range(7):
+            Review.objects.create(product=product, user=user,
+                                  name=f'review {i}', rating=4)
+        Review.objects.create(product=other_product, user=user, rating=1)
+        url = product_detail_url(product.id)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(url, {'include': 'reviews'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        reviews = Review.objects.filter(product=product).order_by(
+            '-created_at', '-id')[:5]
+        serializer = ReviewDetailSerializer(reviews, many=True)
+        self.assertEqual(res.data['reviews'], serializer.data)
+
+    def test_retrieve_product_reviews(self):
+        """Test listing the reviews of a product, newest first."""
+        user = create_user()
+        product = create_product(user=user)
+        other_product = create_product(user=user, title='other')
+        for i in range(3):
+            Review.objects.create(product=product, user=user,
+                                  name=f'review {i}', rating=4)
+        Review.objects.create(product=other_product, user=user, rating=1)
+        url = product_reviews_url(product.id)
+
+        res = self.client.get(url, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        seen = [r['id'] for r in res.data['results']]
+        self.assertEqual(len(seen), 2)
+        res = self.client.get(res.data['next'])
+        seen += [r['id'] for r in res.data['results']]
+
+        expected = Review.objects.filter(product=product).order_by(
+            '-created_at').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_retrieve_product_reviews_not_found(self):
+        """Test listing the reviews of a missing product returns 404."""
+        res = self.client.get(product_reviews_url(1))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
 
 class PrivateProductApiTest(TestCase):
@@ -107,7 +299,7 @@ class PrivateProductApiTest(TestCase):
         )
         create_product(user=other_user, title='title product')
 
-        products = Product.objects.filter(user=self.user)
+        products = Product.objects.filter(user=self.user).order_by('-id')
         serializer = ProductSerializer(products, many=True)
 
         res = self.client.get(PRODUCTS_PRIVATE_URL)
@@ -115,7 +307,7 @@ class PrivateProductApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(products.count(), 2)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_create_product(self):
         """Test the creation of a product."""
@@ -133,6 +325,31 @@ class PrivateProductApiTest(TestCase):
 
         self.assertEqual(product.user, self.user)
 
+    def test_create_product_searchable(self):
+        """Test a created product is indexed for search."""
+        payload = {
+            'title': 'Leather wallet',
+            'description': 'A brown wallet.',
+            'price': Decimal('5.50'),
+        }
+        res = self.client.post(PRODUCTS_PRIVATE_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(
+            list(Product.objects.search('wallet')),
+            [Product.objects.get(pk=res.data['id'])],
+        )
+
+    def test_update_product_searchable(self):
+        """Test an updated product is reindexed for search."""
+        product = create_product(user=self.user, title='Old title')
+        Product.objects.update_search_vector()
+        url = product_detail_private_url(product.id)
+        res = self.client.patch(url, {'title': 'Umbrella'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(list(Product.objects.search('umbrella')), [product])
+
     def test_partial_update_product(self):
         """Testing the partial update of a product."""
         payload = {
@@ -204,3 +421,490 @@ class PrivateProductApiTest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
         self.assertTrue(Product.objects.filter(pk=product.id).exists())
+
+
+class ProductImageTests(TestCase):
+    """Product image upload and variants tests."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_settings.enable()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.product = create_product(user=self.user)
+
+    def tearDown(self):
+        self.media_settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload_image(self, size=(800, 400)):
+        """Uploads an image on the product and returns the response."""
+        url = product_detail_private_url(self.product.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', size, 'red').save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.patch(url, {'image': image_file},
+                                     format='multipart')
+
+    def test_upload_image_queues_variants(self):
+        """Test uploading an image queues the generation of variants."""
+        res = self.upload_image()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.product.refresh_from_db()
+        self.assertTrue(os.path.exists(self.product.image.path))
+        self.assertEqual(self.product.image_variants, {})
+        job = ProductImageJob.objects.get()
+        self.assertEqual(job.product, self.product)
+
+    def test_image_variants(self):
+        """Test the worker generates the variants exposed on the product."""
+        self.upload_image()
+
+        call_command('process_image_jobs', once=True, stdout=StringIO())
+
+        self.product.refresh_from_db()
+        root = os.path.splitext(self.product.image.name)[0]
+        self.assertEqual(self.product.image_variants, {
+            'thumbnail': f'{root}_thumbnail.jpg',
+            'thumbnail_webp': f'{root}_thumbnail.webp',
+            'medium': f'{root}_medium.jpg',
+            'medium_webp': f'{root}_medium.webp',
+        })
+        thumbnail = self.product.image.storage.path(
+            self.product.image_variants['thumbnail_webp'])
+        with Image.open(thumbnail) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (150, 75))
+
+        res = self.client.get(product_detail_url(self.product.id))
+
+        self.assertEqual(
+            res.data['image_variants']['medium'],
+            f'http://testserver/static/media/{root}_medium.jpg',
+        )
+
+    def test_upload_image_stream(self):
+        """Test streaming a raw image to the product image."""
+        url = upload_image_url(self.product.id)
+
+        res = self.client.post(url, image_bytes(format='PNG'),
+                               content_type='image/png')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.image.name.endswith('.png'))
+        with Image.open(self.product.image.path) as image:
+            self.assertEqual(image.size, (800, 400))
+        self.assertTrue(
+            ProductImageJob.objects.filter(product=self.product).exists())
+
+    def test_upload_image_too_large(self):
+        """Test an image above the size limit is rejected unread."""
+        url = upload_image_url(self.product.id)
+
+        with override_settings(PRODUCT_IMAGE_MAX_UPLOAD_SIZE=100):
+            res = self.client.post(url, image_bytes(),
+                                   content_type='image/jpeg')
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.image)
+        self.assertFalse(os.listdir(self.media_root))
+
+    @patch('core.images.UPLOAD_HEADER_SIZE', 1024)
+    def test_save_product_image_size_limit(self):
+        """Test a stream going past the size limit leaves no file."""
+        data = image_bytes()
+
+        with self.assertRaises(ImageTooLarge):
+            save_product_image(self.product, BytesIO(data),
+                               max_size=len(data) - 1, max_dimension=8000)
+
+        self.assertFalse(os.listdir(
+            os.path.join(self.media_root, 'uploads', 'product')))
+
+    def test_upload_image_dimensions_error(self):
+        """Test an image above the dimension limit is rejected."""
+        url = upload_image_url(self.product.id)
+
+        with override_settings(PRODUCT_IMAGE_MAX_DIMENSION=500):
+            res = self.client.post(url, image_bytes(),
+                                   content_type='image/jpeg')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.image)
+
+    def test_upload_invalid_image(self):
+        """Test a body that is not an image is rejected."""
+        url = upload_image_url(self.product.id)
+
+        res = self.client.post(url, b'not an image',
+                               content_type='image/jpeg')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ProductImageJob.objects.exists())
+
+    def test_upload_image_other_user_error(self):
+        """Test uploading an image to another user's product fails."""
+        other_product = create_product(
+            user=create_user(email='other@mail.com'))
+        url = upload_image_url(other_product.id)
+
+        res = self.client.post(url, image_bytes(),
+                               content_type='image/jpeg')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CatalogCacheTests(TestCase):
+    """Public product apis response cache tests."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.product = create_product(user=self.user, title='Shoes')
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request does not query the database."""
+        self.client.get(PRODUCTS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PRODUCTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], 'Shoes')
+
+    def test_cache_keyed_on_query_string(self):
+        """Test requests with different query strings are cached apart."""
+        create_product(user=self.user, title='Hat')
+        self.client.get(PRODUCTS_URL)
+
+        res = self.client.get(PRODUCTS_URL, {'page_size': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_private_write_invalidates_cache(self):
+        """Test a product update is visible right after it is made."""
+        url = product_detail_url(self.product.id)
+        self.client.get(url)
+        self.client.force_authenticate(self.user)
+
+        self.client.patch(product_detail_private_url(self.product.id),
+                          {'title': 'Boots'})
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['title'], 'Boots')
+
+    def test_queryset_update_invalidates_cache(self):
+        """Test writes bypassing the models invalidate the cache too."""
+        self.client.get(PRODUCTS_URL)
+
+        Product.objects.filter(pk=self.product.id).update(title='Boots')
+        res = self.client.get(PRODUCTS_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'Boots')
+
+    def test_not_found_not_cached(self):
+        """Test a missing product is not served from the cache later."""
+        url = product_detail_url(self.product.id + 1)
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        product = create_product(user=self.user)
+        res = self.client.get(product_detail_url(product.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_not_modified(self):
+        """Test a cached product list is answered with a 304."""
+        etag = self.client.get(PRODUCTS_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PRODUCTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_review_update_changes_product_etag(self):
+        """Test editing a review changes the embedding product ETag."""
+        review = Review.objects.create(product=self.product, user=self.user,
+                                       comment='good', rating=4)
+        url = product_detail_url(self.product.id)
+        etag = self.client.get(url, {'include': 'reviews'})['ETag']
+        self.client.force_authenticate(self.user)
+
+        self.client.patch(reverse('product:review-detail', args=[review.id]),
+                          {'comment': 'great'})
+        res = self.client.get(url, {'include': 'reviews'},
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['reviews'][0]['comment'], 'great')
+
+
+@override_settings(CATALOG_CHANGES_SETTLE_TIME=0)
+class ProductChangesTests(TestCase):
+    """Catalog delta sync api tests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.products = [
+            create_product(user=self.user, title=f'product {i}')
+            for i in range(3)
+        ]
+
+    def test_changes_without_token(self):
+        """Test listing the changes without a token lists every product."""
+        res = self.client.get(PRODUCT_CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in res.data['results']],
+                         [p.id for p in self.products])
+        self.assertEqual(res.data['deleted'], [])
+        self.assertFalse(res.data['more'])
+        self.assertTrue(res.data['since'])
+
+    def test_changes_since_token(self):
+        """Test only the products changed since the token are listed."""
+        since = self.client.get(PRODUCT_CHANGES_URL).data['since']
+        self.client.force_authenticate(self.user)
+        self.client.patch(
+            product_detail_private_url(self.products[1].id),
+            {'title': 'updated'},
+        )
+        self.client.delete(product_detail_private_url(self.products[0].id))
+        created = create_product(user=self.user)
+
+        res = self.client.get(PRODUCT_CHANGES_URL, {'since': since})
+
+        self.assertEqual([p['id'] for p in res.data['results']],
+                         [self.products[1].id, created.id])
+        self.assertEqual(res.data['results'][0]['title'], 'updated')
+        self.assertEqual(res.data['deleted'], [self.products[0].id])
+        self.assertTrue(ProductTombstone.objects.filter(
+            product_id=self.products[0].id).exists())
+
+    def test_changes_paginated(self):
+        """Test paging through the changes with the returned tokens."""
+        ids = []
+        params = {'page_size': 2}
+        while True:
+            res = self.client.get(PRODUCT_CHANGES_URL, params)
+            ids += [p['id'] for p in res.data['results']]
+            params['since'] = res.data['since']
+            if not res.data['more']:
+                break
+
+        self.assertEqual(ids, [p.id for p in self.products])
+        res = self.client.get(PRODUCT_CHANGES_URL, params)
+        self.assertEqual(res.data['results'], [])
+        self.assertEqual(res.data['since'], params['since'])
+
+    def test_changes_settle_time(self):
+        """Test the changes still settling are held back."""
+        with override_settings(CATALOG_CHANGES_SETTLE_TIME=60):
+            res = self.client.get(PRODUCT_CHANGES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_changes_invalid_token(self):
+        """Test an invalid token is rejected."""
+        res = self.client.get(PRODUCT_CHANGES_URL, {'since': 'invalid'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SparseFieldsTests(TestCase):
+    """Sparse fields and expansion of the product apis tests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.product = create_product(user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def test_list_fields(self):
+        """Test narrowing the fields of a product list."""
+        res = self.client.get(PRODUCTS_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.data['results'],
+                         [{'id': self.product.id, 'title': 'Product title'}])
+
+    def test_detail_fields_narrow_sql(self):
+        """Test the columns of the fields left out are not loaded."""
+        url = product_detail_private_url(self.product.id)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, {'fields': 'id,rating_histogram'})
+
+        self.assertEqual(set(res.data), {'id', 'rating_histogram'})
+        self.assertEqual(res.data['rating_histogram']['1'], 0)
+        select = queries.captured_queries[-1]['sql']
+        self.assertNotIn('description', select)
+        self.assertIn('rating_1_count', select)
+
+    def test_list_expand_user(self):
+        """Test expanding the user of products in a single query."""
+        create_product(user=self.user, title='other')
+
+        with self.assertNumQueries(2):
+            res = self.client.get(PRODUCTS_PRIVATE_URL, {'expand': 'user'})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(res.data['results'][0]['user'],
+                         {'id': self.user.id, 'name': None})
+
+    def test_write_ignores_fields(self):
+        """Test the fields and expansions only apply to reads."""
+        url = product_detail_private_url(self.product.id)
+
+        res = self.client.patch(f'{url}?fields=id', {'title': 'new'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('description', res.data)
+
+
+class ProductBatchTests(TestCase):
+    """Batch fetch of products api tests."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.products = [
+            create_product(user=self.user, title=f'product {i}')
+            for i in range(3)
+        ]
+
+    def test_batch_get(self):
+        """Test fetching products in request order in one query."""
+        ids = [self.products[2].id, 0, self.products[0].id,
+               self.products[2].id]
+
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                PRODUCT_BATCH_URL, {'ids': ','.join(map(str, ids))})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in res.data['results']],
+                         [self.products[2].id, self.products[0].id])
+        self.assertEqual(res.data['missing'], [0])
+        self.assertEqual(
+            res.data['results'][0],
+            ProductDetailSerializer(self.products[2]).data,
+        )
+
+    def test_batch_post(self):
+        """Test fetching products from the ids of a POST body."""
+        ids = [self.products[1].id, self.products[0].id]
+
+        res = self.client.post(PRODUCT_BATCH_URL, {'ids': ids},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in res.data['results']], ids)
+        self.assertEqual(res.data['missing'], [])
+
+    def test_batch_invalid_ids(self):
+        """Test missing, invalid and too many ids are rejected."""
+        for ids in ['', 'a,b', ','.join(['1'] * 501)]:
+            res = self.client.get(PRODUCT_BATCH_URL, {'ids': ids})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductBulkTests(TestCase):
+    """Bulk create, update and delete of products api tests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create(self):
+        """Test creating products in chunks, reporting invalid rows."""
+        rows = [
+            {'title': f'product {i}', 'price': '1.50'} for i in range(5)
+        ]
+        rows.insert(2, {'title': 'no price'})
+
+        with patch.object(ProductPrivateViewSet, 'bulk_chunk_size', 2):
+            res = self.client.post(PRODUCTS_BULK_URL, rows, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(len(res.data['created']), 5)
+        self.assertEqual([error['index'] for error in res.data['errors']],
+                         [2])
+        self.assertIn('price', res.data['errors'][0]['errors'])
+        products = Product.objects.filter(user=self.user)
+        self.assertEqual(products.count(), 5)
+        self.assertEqual(
+            Product.objects.search('product').count(), 5)
+
+    def test_bulk_update(self):
+        """Test partially updating products, reporting unknown ids."""
+        products = [create_product(user=self.user) for _ in range(3)]
+        other = create_product(user=create_user(email='other@mail.com'))
+        rows = [
+            {'id': products[0].id, 'title': 'first'},
+            {'id': other.id, 'title': 'hijack'},
+            {'id': products[2].id, 'price': '9.99', 'description': 'new'},
+            {'id': products[1].id, 'price': 'free'},
+            {'title': 'no id'},
+        ]
+
+        res = self.client.patch(PRODUCTS_BULK_URL, rows, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['updated'],
+                         [products[0].id, products[2].id])
+        self.assertEqual([error['index'] for error in res.data['errors']],
+                         [1, 3, 4])
+        for product in products:
+            product.refresh_from_db()
+        self.assertEqual(products[0].title, 'first')
+        self.assertEqual(products[0].price, Decimal('5.50'))
+        self.assertEqual(products[2].price, Decimal('9.99'))
+        self.assertEqual(products[2].description, 'new')
+        self.assertEqual(products[1].price, Decimal('5.50'))
+        other.refresh_from_db()
+        self.assertEqual(other.title, 'Product title')
+
+    def test_bulk_delete(self):
+        """Test deleting products with tombstones."""
+        products = [create_product(user=self.user) for _ in range(3)]
+        other = create_product(user=create_user(email='other@mail.com'))
+        ids = [products[0].id, other.id, products[1].id, products[0].id]
+
+        res = self.client.delete(PRODUCTS_BULK_URL, {'ids': ids},
+                                 format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['deleted'], [products[0].id,
+                                               products[1].id])
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertEqual(list(Product.objects.filter(user=self.user)),
+                         [products[2]])
+        self.assertTrue(Product.objects.filter(pk=other.id).exists())
+        self.assertEqual(ProductTombstone.objects.count(), 2)
+
+    def test_bulk_invalid_body(self):
+        """Test a body that is not a list of rows is rejected."""
+        for body in [{'title': 'product'}, []]:
+            res = self.client.post(PRODUCTS_BULK_URL, body, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_all_rows_invalid(self):
+        """Test a 400 is returned when no row is valid."""
+        res = self.client.post(PRODUCTS_BULK_URL, [{'title': 'x'}],
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['created'], [])
@@ -100,10 +100,10 @@ class PrivateReviewTest(TestCase):
         res = self.client.get(REVIEW_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        reviews = Review.objects.all()
+        reviews = Review.objects.order_by('-id')
         serializer = ReviewSerializer(reviews, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_single_review(self):
         """Test retrieving a single review."""
@@ -137,6 +137,33 @@ class PrivateReviewTest(TestCase):
 
         self.assertEqual(res.data, serializer.data)
 
+    def test_create_review_updates_product(self):
+        """Test a review posted to the api counts on its product."""
+        create_review(user=self.user, product=self.product, rating=2)
+        Product.objects.rebuild_ratings()
+
+        res = self.client.post(REVIEW_URL, {
+            'product': self.product.id,
+            'name': 'review name',
+            'rating': 4,
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        review = Review.objects.get(pk=res.data['id'])
+        self.assertEqual(review.product, self.product)
+        self.assertEqual(review.user, self.user)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 2)
+        self.assertEqual(self.product.rating_avg, Decimal('3.00'))
+        self.assertEqual(self.product.rating_4_count, 1)
+
+    def test_create_review_without_product_error(self):
+        """Test a review cannot be created without a product."""
+        res = self.client.post(REVIEW_URL, {'rating': 4}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('product', res.data)
+
     def test_update_partial_review(self):
         """Testing the partial update of each review."""
         review = create_review(
@@ -233,3 +260,63 @@ class PrivateReviewTest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Review.objects.filter(pk=review.id).exists())
+
+    def test_update_review_rating_updates_product(self):
+        """Test changing a review rating moves it on the product."""
+        review = create_review(
+            user=self.user,
+            product=self.product,
+            rating=5,
+        )
+        create_review(user=self.user, product=self.product, rating=3)
+        Product.objects.rebuild_ratings()
+        url = review_detail_url(review.id)
+        res = self.client.patch(url, {'rating': 1})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 2)
+        self.assertEqual(self.product.rating_avg, Decimal('2.00'))
+        self.assertEqual(self.product.rating_1_count, 1)
+        self.assertEqual(self.product.rating_5_count, 0)
+
+    def test_delete_review_updates_product(self):
+        """Test deleting a review discounts its rating on the product."""
+        review = create_review(
+            user=self.user,
+            product=self.product,
+            rating=5,
+        )
+        create_review(user=self.user, product=self.product, rating=3)
+        Product.objects.rebuild_ratings()
+        url = review_detail_url(review.id)
+        res = self.client.delete(url)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 1)
+        self.assertEqual(self.product.rating_avg, Decimal('3.00'))
+        self.assertEqual(self.product.rating_5_count, 0)
+
+    def test_retrieve_reviews_expand(self):
+        """Test expanding the product and user of reviews in one query."""
+        other_product = create_product(user=self.user, title='other')
+        for product in [self.product, other_product, self.product]:
+            create_review(product=product, user=self.user)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(REVIEW_URL, {'expand': 'product,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        review = res.data['results'][0]
+        self.assertEqual(review['product']['id'], self.product.id)
+        self.assertEqual(review['product']['title'], 'Product title')
+        self.assertEqual(review['user'], {'id': self.user.id, 'name': None})
+
+    def test_retrieve_reviews_fields(self):
+        """Test narrowing the fields of reviews."""
+        create_review(product=self.product, user=self.user)
+
+        res = self.client.get(REVIEW_URL, {'fields': 'id,rating,unknown'})
+
+        self.assertEqual(list(res.data['results'][0]), ['id', 'rating'])
@@ -0,0 +1,75 @@
+"""
+Product serializers unit tests.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Order, OrderItem, Product, Review
+from product.serializers import (
+    OrderDetailSerializer,
+    OrderItemSerializer,
+    OrderSerializer,
+    ProductDetailSerializer,
+    ProductSerializer,
+    ReviewSerializer,
+)
+
+
+class ValuesSerializerTests(TestCase):
+    """Values fast path of the read serializers tests."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(
+            email='email@mail.com',
+            password='pass12345',
+        )
+        self.product = Product.objects.create(
+            user=self.user, title='product', price=Decimal('5.5'))
+        Product.objects.create(user=self.user, title=None, price=Decimal('0'))
+        Product.objects.filter(pk=self.product.pk).apply_rating(4)
+        Review.objects.create(product=self.product, user=self.user,
+                              name='review', rating=4)
+        Review.objects.create(product=None, user=self.user, name=None,
+                              rating=None)
+        order = Order.objects.create(user=self.user, price=Decimal('11'),
+                                     done=True, processed_at=timezone.now())
+        OrderItem.objects.create(product=self.product, order=order,
+                                 name='item', price=Decimal('5.50'),
+                                 quantity=2)
+        OrderItem.objects.create(product=None, order=None, name='item',
+                                 price=Decimal('1'))
+
+    def assertSameRepresentation(self, serializer_class, queryset):
+        queryset = queryset.order_by('id')
+        serializer = serializer_class()
+
+        data = serializer.to_values_representation(
+            serializer.values(queryset))
+
+        self.assertEqual(
+            data, serializer_class(queryset, many=True).data)
+
+    def test_product_values(self):
+        """Test the product fast path matches the serializer output."""
+        self.assertSameRepresentation(ProductSerializer, Product.objects)
+
+    def test_review_values(self):
+        """Test the review fast path matches the serializer output."""
+        self.assertSameRepresentation(ReviewSerializer, Review.objects)
+
+    def test_order_values(self):
+        """Test the order fast path matches the serializer output."""
+        self.assertSameRepresentation(OrderSerializer, Order.objects)
+        self.assertSameRepresentation(OrderDetailSerializer, Order.objects)
+
+    def test_order_item_values(self):
+        """Test the order item fast path matches the serializer output."""
+        self.assertSameRepresentation(OrderItemSerializer, OrderItem.objects)
+
+    def test_values_unsupported_field(self):
+        """Test fields without a plain source are rejected."""
+        with self.assertRaises(TypeError):
+            ProductDetailSerializer().values(Product.objects.all())
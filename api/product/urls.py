@@ -29,5 +29,9 @@ router.register('orderitemprivate',
 app_name = 'product'
 urlpatterns = [
     path('', include(router.urls)),
-    path('process-order/', views.ProcessOrder.as_view(), name='processorder')
+    path('process-order/', views.ProcessOrder.as_view(), name='processorder'),
+    path('process-orders/',
+         views.ProcessOrders.as_view(),
+         name='processorders'),
+    path('checkout/', views.Checkout.as_view(), name='checkout'),
 ]
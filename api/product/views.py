@@ -1,35 +1,119 @@
 """
 Product APIs.
 """
-
+import hashlib
+import json
+
+from .mixins import (
+    CatalogCacheMixin,
+    ConditionalGetMixin,
+    SparseFieldsMixin,
+    ValuesListMixin,
+    )
+from .pagination import (
+    ChangesPagination,
+    IdCursorPagination,
+    KeysetCursorPagination,
+    ReviewCursorPagination,
+    SearchPagination,
+    )
 from .serializers import (
+    CheckoutSerializer,
+    ProcessOrderSerializer,
+    ProcessOrdersSerializer,
     OrderDetailSerializer,
     OrderSerializer,
     ProductDetailSerializer,
+    ProductImageSerializer,
     ProductSerializer,
     ReviewDetailSerializer,
     ReviewSerializer,
-    OrderItemSerializer
+    OrderItemSerializer,
+    OrderJobSerializer,
+    ProductBatchSerializer,
+    ProductBulkDeleteSerializer,
     )
+from core.images import ImageTooLarge, InvalidImage, save_product_image
 from core.models import (
+    ORDER_PRICE_MAX,
+    IdempotencyKey,
     Product,
     Review,
     Order,
-    OrderItem)
-
+    OrderItem,
+    OrderJob,
+    ProductImageJob,
+    ProductTombstone)
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, transaction
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
-from rest_framework import viewsets, mixins
+from rest_framework import generics, viewsets, mixins
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
 from rest_framework import permissions, status
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from user.authentication import StatelessJWTAuthentication
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+
+class ProductViewSet(CatalogCacheMixin,
+                     ValuesListMixin,
+                     SparseFieldsMixin,
+                     viewsets.ReadOnlyModelViewSet):
     """Product api readonly viewset."""
     queryset = Product.objects.all()
+    pagination_class = KeysetCursorPagination
     serializer_class = ProductDetailSerializer
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['id', 'rating_avg', 'rating_count']
+    included_reviews = 5
+
+    def get_includes(self):
+        """Returns the related objects to embed, from ?include=."""
+        request = getattr(self, 'request', None)
+        if request is None:
+            return set()
+        return set(request.query_params.get('include', '').split(','))
+
+    def get_search_query(self):
+        """Returns the full-text search terms of a list request, if any."""
+        request = getattr(self, 'request', None)
+        if request is None or self.action != 'list':
+            return None
+        return request.query_params.get('q', '').strip() or None
+
+    @property
+    def ordering(self):
+        """Search results keep their rank order unless asked otherwise."""
+        return None if self.get_search_query() else ['-id']
+
+    @property
+    def paginator(self):
+        """Search results are ranked, so they are paged by number."""
+        if self.get_search_query():
+            self.pagination_class = SearchPagination
+        return super().paginator
+
+    def get_queryset(self):
+        queryset = self.queryset
+        query = self.get_search_query()
+        if query:
+            queryset = queryset.search(query)
+        return queryset
+
+    def get_object(self):
+        """Returns the product, with its newest reviews if included."""
+        product = super().get_object()
+        if self.action == 'retrieve' and 'reviews' in self.get_includes():
+            product.latest_reviews = list(
+                Review.objects.filter(product=product).order_by(
+                    '-created_at', '-id')[:self.included_reviews])
+        return product
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -37,13 +121,107 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         else:
             return self.serializer_class
 
+    def get_conditional_queryset(self):
+        if self.action == 'reviews':
+            return Review.objects.filter(product=self.kwargs['pk'])
+        if self.action == 'batch':
+            return self.get_queryset().filter(pk__in=self.get_batch_ids())
+        return super().get_conditional_queryset()
+
+    def get_batch_ids(self):
+        """Returns the unique ids of a batch request, in request order."""
+        if self.request.method == 'GET':
+            ids = self.request.query_params.get('ids', '')
+            data = {'ids': [pk for pk in ids.split(',') if pk.strip()]}
+        else:
+            data = self.request.data
+        serializer = ProductBatchSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        return list(dict.fromkeys(serializer.validated_data['ids']))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include'] = self.get_includes()
+        return context
+
+    @action(
+        detail=True,
+        serializer_class=ReviewDetailSerializer,
+        pagination_class=ReviewCursorPagination,
+        filter_backends=[],
+    )
+    def reviews(self, request, pk=None):
+        """Lists the reviews of a product, newest first."""
+        return self.conditional_response(self.list_reviews, request)
+
+    @action(detail=False, methods=['get', 'post'])
+    def batch(self, request):
+        """Lists the products of up to 500 ids, in the order requested.
+
+        The ids are read from ?ids=1,2,3 or from the ids list of a POST
+        body, the ids of no product are listed as missing.
+        """
+        if request.method == 'GET':
+            return self.conditional_response(self.list_batch, request)
+        return self.list_batch(request)
+
+    def list_batch(self, request):
+        ids = self.get_batch_ids()
+        products = self.narrow_queryset(self.get_queryset()).in_bulk(ids)
+        serializer = self.get_serializer(
+            [products[pk] for pk in ids if pk in products],
+            many=True,
+        )
+
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in products],
+        })
+
+    @action(detail=False, pagination_class=ChangesPagination)
+    def changes(self, request):
+        """Lists the products changed or deleted since a token.
+
+        Returns the changed products, the ids of the deleted ones, and
+        the token to continue from.
+        """
+        paginator = self.paginator
+        changed, deleted = paginator.paginate_changes(
+            Product.objects.all(),
+            ProductTombstone.objects.all(),
+            request,
+        )
+        products = self.get_queryset().in_bulk(changed)
+        serializer = self.get_serializer(
+            [products[pk] for pk in changed if pk in products],
+            many=True,
+        )
+
+        return paginator.get_paginated_response(serializer.data, deleted)
 
-class ProductPrivateViewSet(viewsets.ModelViewSet):
+    def list_reviews(self, request):
+        product = self.get_object()
+        reviews = self.paginate_queryset(
+            self.narrow_queryset(Review.objects.filter(product=product))
+        )
+        serializer = self.get_serializer(reviews, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+
+class ProductPrivateViewSet(ConditionalGetMixin,
+                            ValuesListMixin,
+                            SparseFieldsMixin,
+                            viewsets.ModelViewSet):
     """Product api viewset."""
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     queryset = Product.objects.all()
+    pagination_class = IdCursorPagination
     serializer_class = ProductDetailSerializer
+    bulk_max_rows = 50000
+    bulk_chunk_size = 1000
 
     def get_queryset(self):
         return self.queryset.filter(
@@ -56,16 +234,263 @@ class ProductPrivateViewSet(viewsets.ModelViewSet):
         else:
             return self.serializer_class
 
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """Creates, partially updates or deletes products in bulk.
+
+        POST takes a list of products, PATCH a list of partial products
+        with their id, and DELETE the list of ids to delete. Every row is
+        validated first, the valid ones are then written by chunks, each
+        in its own transaction. Returns the ids written and the errors of
+        the other rows, by index in the request.
+        """
+        if request.method == 'DELETE':
+            ids, errors = self.destroy_many(request.data)
+            return self.bulk_response('deleted', ids, errors)
+
+        rows = request.data
+        if not isinstance(rows, list) or not rows:
+            raise ValidationError('Expected a non empty list of products.')
+        if len(rows) > self.bulk_max_rows:
+            raise ValidationError(
+                f'At most {self.bulk_max_rows} products per request.')
+
+        if request.method == 'POST':
+            ids, errors = self.create_many(rows)
+            return self.bulk_response(
+                'created', ids, errors, status.HTTP_201_CREATED)
+
+        ids, errors = self.update_many(rows)
+        return self.bulk_response('updated', ids, errors)
+
+    def bulk_response(self, name, ids, errors, success=status.HTTP_200_OK):
+        """Returns 207 when some rows failed, 400 when all of them did."""
+        if not errors:
+            code = success
+        elif ids:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+
+        return Response({name: ids, 'errors': errors}, code)
+
+    def validate_rows(self, rows, partial=False):
+        """Validates the (index, row) pairs of rows.
+
+        Returns the (index, data) pairs of the valid rows and the errors
+        of the others.
+        """
+        serializer = self.get_serializer(partial=partial)
+        valid, errors = [], []
+        for index, row in rows:
+            try:
+                data = serializer.run_validation(row)
+            except ValidationError as error:
+                errors.append({'index': index, 'errors': error.detail})
+                continue
+            if 'image' in data:
+                data['image_variants'] = {}
+            valid.append((index, data))
+
+        return valid, errors
+
+    def write_chunks(self, rows, write):
+        """Writes the (index, row) pairs of rows by chunks.
+
+        Each chunk is written in its own transaction, a failed chunk has
+        an error reported for each of its rows. Returns the written pairs
+        and the errors.
+        """
+        written, errors = [], []
+        for start in range(0, len(rows), self.bulk_chunk_size):
+            chunk = rows[start:start + self.bulk_chunk_size]
+            try:
+                with transaction.atomic():
+                    write([row for _, row in chunk])
+            except DatabaseError as error:
+                errors += [
+                    {'index': index, 'errors': [str(error)]}
+                    for index, _ in chunk
+                ]
+            else:
+                written += chunk
+
+        return written, errors
+
+    def create_many(self, rows):
+        """Creates the valid products of rows."""
+        valid, errors = self.validate_rows(enumerate(rows))
+        products = [
+            (index, Product(user=self.request.user, **data))
+            for index, data in valid
+        ]
+
+        def write(products):
+            Product.objects.bulk_create(products)
+            Product.objects.filter(
+                pk__in=[product.pk for product in products]
+            ).update_search_vector()
+
+        created, chunk_errors = self.write_chunks(products, write)
+
+        return (
+            [product.pk for _, product in created],
+            sorted(errors + chunk_errors, key=lambda error: error['index']),
+        )
+
+    def update_many(self, rows):
+        """Partially updates the products of rows, found by their id."""
+        ids = [row.get('id') if isinstance(row, dict) else None
+               for row in rows]
+        products = self.get_queryset().in_bulk(
+            [pk for pk in ids if isinstance(pk, int)])
+        found = [
+            isinstance(pk, int) and pk in products for pk in ids
+        ]
+        errors = [
+            {'index': index, 'errors': {'id': ['Product not found.']}}
+            for index in range(len(rows)) if not found[index]
+        ]
+        valid, validation_errors = self.validate_rows(
+            [(index, row) for index, row in enumerate(rows) if found[index]],
+            partial=True,
+        )
+
+        updates = []
+        for index, data in valid:
+            product = products[ids[index]]
+            for field, value in data.items():
+                setattr(product, field, value)
+            updates.append((index, (product, list(data))))
+
+        def write(updates):
+            products = [product for product, _ in updates]
+            fields = {field for _, fields in updates for field in fields}
+            if fields:
+                Product.objects.bulk_update(products, fields)
+            Product.objects.filter(
+                pk__in=[product.pk for product in products]
+            ).update_search_vector()
+
+        updated, chunk_errors = self.write_chunks(updates, write)
+
+        return (
+            [product.pk for _, (product, _) in updated],
+            sorted(errors + validation_errors + chunk_errors,
+                   key=lambda error: error['index']),
+        )
+
+    def destroy_many(self, data):
+        """Deletes the products of the ids in data, with tombstones."""
+        serializer = ProductBulkDeleteSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        owned = set(self.get_queryset().filter(
+            pk__in=ids).values_list('pk', flat=True))
+        errors = [
+            {'index': index, 'errors': {'id': ['Product not found.']}}
+            for index, pk in enumerate(ids) if pk not in owned
+        ]
+
+        def write(pks):
+            Product.objects.filter(pk__in=pks).delete()
+
+        deletes = {}
+        for index, pk in enumerate(ids):
+            if pk in owned:
+                deletes.setdefault(pk, index)
+        deleted, chunk_errors = self.write_chunks(
+            [(index, pk) for pk, index in deletes.items()], write)
+
+        return (
+            [pk for _, pk in deleted],
+            sorted(errors + chunk_errors, key=lambda error: error['index']),
+        )
+
     def perform_create(self, serializer):
         """Assigns the user to the product object."""
-        serializer.save(user=self.request.user)
-
+        self.save_product(serializer, user=self.request.user)
+
+    def perform_update(self, serializer):
+        """Updates the product."""
+        self.save_product(serializer)
+
+    def save_product(self, serializer, **kwargs):
+        """Saves the product and keeps its derived data current.
+
+        The search vector is refreshed, and a new image has its resized
+        variants queued for the image worker.
+        """
+        new_image = 'image' in serializer.validated_data
+        if new_image:
+            kwargs['image_variants'] = {}
+        product = serializer.save(**kwargs)
+        Product.objects.filter(pk=product.pk).update_search_vector()
+        if new_image and product.image:
+            ProductImageJob.objects.enqueue([product.pk])
+
+    @action(
+        detail=True,
+        methods=['post'],
+        url_path='upload-image',
+        serializer_class=ProductImageSerializer,
+    )
+    def upload_image(self, request, pk=None):
+        """Streams the request body, a raw image, to the product image.
+
+        The declared size is checked before the body is read, the format
+        and dimensions from the image header. The resized variants are
+        generated later by the image worker.
+        """
+        product = self.get_object()
+        max_size = settings.PRODUCT_IMAGE_MAX_UPLOAD_SIZE
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if content_length > max_size:
+            return Response(
+                {'detail': f'The image is larger than {max_size} bytes.'},
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        if request.stream is None:
+            return Response(
+                {'detail': 'Missing image.'},
+                status.HTTP_400_BAD_REQUEST,
+            )
 
-class ReviewViewSet(viewsets.ModelViewSet):
+        try:
+            product.image = save_product_image(
+                product,
+                request.stream,
+                max_size=max_size,
+                max_dimension=settings.PRODUCT_IMAGE_MAX_DIMENSION,
+            )
+        except ImageTooLarge as error:
+            return Response(
+                {'detail': str(error)},
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        except InvalidImage as error:
+            return Response(
+                {'detail': str(error)},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        product.image_variants = {}
+        product.save(
+            update_fields=['image', 'image_variants', 'updated_at'])
+        ProductImageJob.objects.enqueue([product.pk])
+
+        return Response(self.get_serializer(product).data, status.HTTP_200_OK)
+
+
+class ReviewViewSet(ConditionalGetMixin,
+                    ValuesListMixin,
+                    SparseFieldsMixin,
+                    viewsets.ModelViewSet):
     """Product api viewset."""
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     queryset = Review.objects.all()
+    pagination_class = IdCursorPagination
     serializer_class = ReviewDetailSerializer
 
     def get_serializer_class(self):
@@ -74,15 +499,51 @@ class ReviewViewSet(viewsets.ModelViewSet):
         else:
             return self.serializer_class
 
-
-class OrderViewSet(mixins.CreateModelMixin,
+    def perform_create(self, serializer):
+        """Creates the review and counts its rating on the product."""
+        with transaction.atomic():
+            review = serializer.save(user=self.request.user)
+            Product.objects.filter(
+                pk=review.product_id
+            ).apply_rating(review.rating)
+
+    def perform_update(self, serializer):
+        """Updates the review and moves its rating on the product."""
+        product_id = serializer.instance.product_id
+        rating = serializer.instance.rating
+        with transaction.atomic():
+            review = serializer.save()
+            if (review.product_id, review.rating) != (product_id, rating):
+                Product.objects.filter(
+                    pk=product_id
+                ).apply_rating(rating, delta=-1)
+                Product.objects.filter(
+                    pk=review.product_id
+                ).apply_rating(review.rating)
+            else:
+                Product.objects.filter(pk=review.product_id).touch()
+
+    def perform_destroy(self, instance):
+        """Deletes the review and discounts its rating on the product."""
+        with transaction.atomic():
+            instance.delete()
+            Product.objects.filter(
+                pk=instance.product_id
+            ).apply_rating(instance.rating, delta=-1)
+
+
+class OrderViewSet(ConditionalGetMixin,
+                   ValuesListMixin,
+                   SparseFieldsMixin,
+                   mixins.CreateModelMixin,
                    mixins.RetrieveModelMixin,
                    mixins.ListModelMixin,
                    viewsets.GenericViewSet):
     """Order api viewset."""
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     queryset = Order.objects.all()
+    pagination_class = IdCursorPagination
     serializer_class = OrderDetailSerializer
 
     def get_queryset(self):
@@ -111,14 +572,18 @@ class OrderPrivateViewset(OrderViewSet,
         return self.queryset
 
 
-class OrderItemViewset(mixins.CreateModelMixin,
+class OrderItemViewset(ConditionalGetMixin,
+                       ValuesListMixin,
+                       SparseFieldsMixin,
+                       mixins.CreateModelMixin,
                        mixins.RetrieveModelMixin,
                        mixins.ListModelMixin,
                        viewsets.GenericViewSet):
     """OrderItem viewset for normal users."""
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     queryset = OrderItem.objects.all()
+    pagination_class = IdCursorPagination
     serializer_class = OrderItemSerializer
 
     def get_queryset(self):
@@ -126,6 +591,52 @@ class OrderItemViewset(mixins.CreateModelMixin,
             order__user=self.request.user
         )
 
+    def get_order_queryset(self):
+        """Returns the orders items can be added to."""
+        return Order.objects.filter(user_id=self.request.user.pk)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['orders'] = self.get_order_queryset()
+        return context
+
+    def save_item(self, save, order_ids):
+        """Saves an item and updates the price of its orders.
+
+        The orders are locked first, so that concurrent item writes do
+        not lose a price. Raises a ValidationError if a price would go
+        over ORDER_PRICE_MAX.
+        """
+        order_ids = sorted({pk for pk in order_ids if pk is not None})
+        with transaction.atomic():
+            list(Order.objects.select_for_update().filter(
+                pk__in=order_ids,
+            ).order_by('pk').values_list('pk', flat=True))
+            item = save()
+            orders = Order.objects.filter(pk__in=order_ids)
+            if orders.over_price_max().exists():
+                raise ValidationError({'quantity': [
+                    f'The order price cannot exceed {ORDER_PRICE_MAX}.']})
+            orders.update_price()
+
+        return item
+
+    def perform_create(self, serializer):
+        """Creates the item and updates the price of its order."""
+        order = serializer.validated_data.get('order')
+        self.save_item(serializer.save, [order and order.pk])
+
+    def perform_update(self, serializer):
+        """Updates the item and the price of the orders it belongs to."""
+        instance = serializer.instance
+        order = serializer.validated_data.get('order', instance.order)
+        self.save_item(
+            serializer.save, [instance.order_id, order and order.pk])
+
+    def perform_destroy(self, instance):
+        """Deletes the item and updates the price of its order."""
+        self.save_item(instance.delete, [instance.order_id])
+
 
 class OrderItemPrivateViewset(OrderItemViewset,
                               mixins.UpdateModelMixin,
@@ -137,24 +648,138 @@ class OrderItemPrivateViewset(OrderItemViewset,
     def get_queryset(self):
         return self.queryset
 
-
-class ProcessOrder(APIView):
+    def get_order_queryset(self):
+        return Order.objects.all()
+
+
+class IdempotentAPIView(generics.GenericAPIView):
+    """Api view replaying the response of retried POST requests.
+
+    A POST sent with an Idempotency-Key header is processed once: its
+    response is stored under the key, the user and the path, and
+    returned again to any retry for IDEMPOTENCY_KEY_TTL seconds.
+    Concurrent retries wait for the first request to commit. A key
+    reused with another body is rejected with a 422.
+    """
+
+    def get_request_hash(self, request):
+        """Returns the hash of the body of a request."""
+        data = request.data
+        if hasattr(data, 'lists'):
+            data = dict(data.lists())
+        body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+
+        return hashlib.sha256(body.encode()).hexdigest()
+
+    def post(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return self.process(request)
+
+        request_hash = self.get_request_hash(request)
+        with transaction.atomic():
+            record, created = IdempotencyKey.objects.select_for_update(
+            ).get_or_create(
+                user=request.user,
+                path=request.path,
+                key=key,
+                defaults={'request_hash': request_hash},
+            )
+            if not created and record.is_expired():
+                record.request_hash = request_hash
+                record.created_at = timezone.now()
+            elif not created:
+                if record.request_hash != request_hash:
+                    return Response(
+                        {'detail': 'Idempotency-Key was used for another '
+                                   'request.'},
+                        status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                return Response(record.response, record.status_code)
+
+            response = self.process(request)
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save()
+
+        return response
+
+    def process(self, request):
+        """Handles the POST request and returns its response."""
+        raise NotImplementedError
+
+
+class ProcessOrder(IdempotentAPIView):
     """Process order api view."""
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    queryset = Order.objects.all()
+    serializer_class = ProcessOrderSerializer
 
-    def post(self, request):
-        """Process order."""
+    def get_queryset(self):
+        """Staff may process any order, users only their own."""
+        if self.request.user.is_staff:
+            return self.queryset
+        return self.queryset.filter(user=self.request.user)
+
+    def process(self, request):
+        """Queues the processing of the order.
+
+        Returns the queued job with a 202, or the order itself with a 200
+        when it is already done.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        order = get_object_or_404(
+            self.get_queryset(),
+            pk=serializer.validated_data['order'],
+        )
+        if order.done:
+            return Response(OrderSerializer(order).data, status.HTTP_200_OK)
 
-        try:
-            order_id = request.data.get('order')
-            order = Order.objects.get(pk=order_id)
-            order.done = True
-            order.processed_at = timezone.now()
-            order.save()
-            serializer = OrderSerializer(order)
+        job, created = OrderJob.objects.active().get_or_create(order=order)
+
+        return Response(
+            OrderJobSerializer(job).data,
+            status.HTTP_202_ACCEPTED,
+        )
+
+
+class ProcessOrders(ProcessOrder):
+    """Process orders in bulk api view."""
+    serializer_class = ProcessOrdersSerializer
+
+    def process(self, request):
+        """Queues the processing of every listed pending order."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-            return Response(serializer.data, status.HTTP_200_OK)
+        order_ids = self.get_queryset().filter(
+            pk__in=serializer.validated_data['orders'],
+            done=False,
+        ).values_list('pk', flat=True)
+        jobs = OrderJob.objects.enqueue(list(order_ids)).order_by('order')
 
-        except KeyError:
-            Response({'detail': 'Missing order id.'})
+        return Response(
+            OrderJobSerializer(jobs, many=True).data,
+            status.HTTP_202_ACCEPTED,
+        )
+
+
+class Checkout(generics.GenericAPIView):
+    """Checkout api view."""
+    authentication_classes = [StatelessJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = CheckoutSerializer
+
+    def post(self, request):
+        """Creates an order with its items from a cart."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order = serializer.save(user=request.user)
+
+        return Response(
+            OrderDetailSerializer(order).data,
+            status.HTTP_201_CREATED,
+        )
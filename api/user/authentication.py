@@ -0,0 +1,160 @@
+"""
+Stateless JWT authentication.
+
+The user of a request is built from the claims of its access token
+instead of being loaded from the database. Revocation is checked
+against the state of the user, read at most once per
+JWT_USER_STATE_TTL seconds in each process.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+    )
+from rest_framework_simplejwt.settings import api_settings
+
+
+USER_CLAIMS = ('email', 'is_staff', 'is_superuser')
+
+
+class TTLCache:
+    """Thread safe in-process cache whose entries expire after ttl seconds.
+
+    The cache is emptied when it holds max_size entries.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the value of key, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+
+        return entry[1]
+
+    def set(self, key, value, ttl):
+        """Stores value under key for ttl seconds."""
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries.clear()
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key):
+        """Removes key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+user_states = TTLCache()
+
+
+def revoke_user_tokens(user_id):
+    """Revokes the access tokens issued to a user until now.
+
+    Other processes honour the revocation once their cached state of
+    the user expires.
+    """
+    get_user_model().objects.filter(
+        **{api_settings.USER_ID_FIELD: user_id},
+    ).update(tokens_revoked_at=timezone.now())
+    user_states.delete(user_id)
+
+
+def load_user_state(user_id):
+    """Reads the flags and the tokens revocation time of a user.
+
+    The state is empty when the user does not exist.
+    """
+    return get_user_model().objects.filter(
+        **{api_settings.USER_ID_FIELD: user_id},
+    ).values(
+        'is_active', 'is_staff', 'is_superuser', 'tokens_revoked_at',
+    ).first() or {}
+
+
+def get_user_state(user_id):
+    """Returns the state of a user, cached for JWT_USER_STATE_TTL."""
+    state = user_states.get(user_id)
+    if state is None:
+        state = load_user_state(user_id)
+        user_states.set(user_id, state, settings.JWT_USER_STATE_TTL)
+
+    return state
+
+
+def issued_before_revocation(token, state):
+    """Returns whether a token was issued before the user revoked them."""
+    revoked_at = state['tokens_revoked_at']
+
+    return bool(
+        revoked_at
+        and token.get('iat', 0) < int(revoked_at.timestamp())
+    )
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT authentication building the user from the token claims.
+
+    The user is an instance of the user model holding only the claimed
+    fields, the others are deferred. Tokens are rejected once the user
+    is deleted or deactivated, when their staff flags no longer match
+    the user, or when they were revoked. Tokens without the claims fall
+    back to loading the user.
+    """
+
+    def get_user(self, validated_token):
+        """Returns the user of a validated token."""
+        if any(claim not in validated_token for claim in USER_CLAIMS):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+
+        state = get_user_state(user_id)
+        if not state:
+            raise AuthenticationFailed(
+                _('User not found'), code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive')
+        if (
+            any(state[flag] != validated_token[flag]
+                for flag in ('is_staff', 'is_superuser'))
+            or issued_before_revocation(validated_token, state)
+        ):
+            raise AuthenticationFailed(
+                _('Token has been revoked'), code='token_revoked')
+
+        claims = {
+            api_settings.USER_ID_FIELD: user_id,
+            'is_active': True,
+            **{claim: validated_token[claim] for claim in USER_CLAIMS},
+        }
+        fields = [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in claims
+        ]
+
+        return self.user_model.from_db(
+            DEFAULT_DB_ALIAS, fields, [claims[name] for name in fields])
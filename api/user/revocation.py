@@ -0,0 +1,183 @@
+"""
+Refresh token revocation.
+
+Revoked refresh tokens are stored in the TokenRevocation table and
+mirrored in each process by a Bloom filter, so checking a token that
+was never revoked is a memory probe. The filter is built from the table
+on first use, then synced every REVOCATION_FILTER_SYNC_INTERVAL seconds
+with the rows revoked since the last sync, minus an overlap of
+REVOCATION_FILTER_SYNC_OVERLAP seconds for the rows committed late;
+tokens the filter may hold are confirmed in the table.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from core.models import TokenRevocation
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from user.authentication import (
+    issued_before_revocation,
+    load_user_state,
+    )
+
+
+class BloomFilter:
+    """Probabilistic set of strings.
+
+    An item added is always found, an item never added is found at a
+    rate of error_rate once capacity items were added.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item):
+        """Adds an item."""
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationFilter:
+    """Bloom filter of the revoked refresh tokens, synced with the table.
+
+    The filter is rebuilt, twice as large, once it holds more tokens
+    than its capacity.
+    """
+
+    def __init__(self):
+        self.bloom = None
+        self.synced_until = None
+        self.synced_at = 0
+        self._lock = threading.Lock()
+
+    def rebuild(self, capacity=None):
+        """Builds the filter from the unexpired revocations."""
+        synced_until = timezone.now()
+        revocations = TokenRevocation.objects.filter(
+            expires_at__gt=synced_until,
+        )
+        capacity = max(
+            capacity or settings.REVOCATION_FILTER_CAPACITY,
+            revocations.count() * 2,
+        )
+        bloom = BloomFilter(capacity, settings.REVOCATION_FILTER_ERROR_RATE)
+        jtis = revocations.order_by().values_list('jti', flat=True)
+        for jti in jtis.iterator(chunk_size=10000):
+            bloom.add(jti)
+
+        self.bloom = bloom
+        self.synced_until = synced_until
+        self.synced_at = time.monotonic()
+
+    def sync(self):
+        """Adds the tokens revoked since the last sync, when it is due.
+
+        A revocation is stamped before it commits, so the rows stamped
+        up to REVOCATION_FILTER_SYNC_OVERLAP seconds before the last sync
+        are read again.
+        """
+        with self._lock:
+            if self.bloom is None:
+                self.rebuild()
+                return
+            interval = settings.REVOCATION_FILTER_SYNC_INTERVAL
+            if time.monotonic() - self.synced_at < interval:
+                return
+
+            synced_until = timezone.now()
+            jtis = TokenRevocation.objects.filter(
+                revoked_at__gte=self.synced_until - timedelta(
+                    seconds=settings.REVOCATION_FILTER_SYNC_OVERLAP),
+            ).values_list('jti', flat=True)
+            for jti in jtis:
+                if jti not in self.bloom:
+                    self.bloom.add(jti)
+            self.synced_until = synced_until
+            self.synced_at = time.monotonic()
+
+            if self.bloom.count > self.bloom.capacity:
+                self.rebuild(self.bloom.capacity * 2)
+
+    def add(self, jti):
+        """Adds a token revoked by this process."""
+        with self._lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+
+    def is_revoked(self, jti):
+        """Returns whether the token jti was revoked."""
+        self.sync()
+        if jti not in self.bloom:
+            return False
+
+        return TokenRevocation.objects.filter(jti=jti).exists()
+
+
+revocations = RevocationFilter()
+
+
+def check_refresh_token(token):
+    """Raises TokenError if the user of a refresh token revoked it.
+
+    Refresh tokens issued before the tokens of their user were revoked,
+    on a password change, are rejected, like those of a deleted or
+    inactive user. The user state is read from the database.
+    """
+    state = load_user_state(token.get(api_settings.USER_ID_CLAIM))
+    if not state or not state['is_active']:
+        raise TokenError(_('User is inactive or does not exist'))
+    if issued_before_revocation(token, state):
+        raise TokenError(_('Token is revoked'))
+
+
+def revoke_refresh_token(token):
+    """Revokes a refresh token.
+
+    Raises TokenError if the token already was revoked, by its user or
+    by an earlier rotation, so that a token is rotated only once.
+    """
+    check_refresh_token(token)
+    jti = token[api_settings.JTI_CLAIM]
+    if revocations.is_revoked(jti):
+        raise TokenError(_('Token is revoked'))
+
+    try:
+        with transaction.atomic():
+            TokenRevocation.objects.create(
+                jti=jti,
+                expires_at=datetime.fromtimestamp(
+                    token['exp'], tz=timezone.utc),
+            )
+    except IntegrityError:
+        raise TokenError(_('Token is revoked'))
+
+    revocations.add(jti)
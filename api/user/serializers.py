@@ -4,11 +4,27 @@ User related serializers.
 from django.contrib.auth import get_user_model
 
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+    )
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.authentication import USER_CLAIMS, revoke_user_tokens
+from user.revocation import revoke_refresh_token
 
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
+    @classmethod
+    def get_token(cls, user):
+        """Returns a token claiming the user fields of USER_CLAIMS."""
+        token = super().get_token(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -19,13 +35,55 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh serializer revoking the refresh token it rotates."""
+
+    def validate(self, attrs):
+        revoke_refresh_token(RefreshToken(attrs['refresh']))
+
+        return super().validate(attrs)
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    """Refresh token revocation serializer."""
+    refresh = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        revoke_refresh_token(RefreshToken(attrs['refresh']))
+
+        return {}
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Public user serializer, without the email."""
+
+    class Meta:
+        model = get_user_model()
+        fields = ['id', 'name']
+        read_only_fields = fields
+
+
 class UserSerializer(serializers.ModelSerializer):
     """User serializer"""
 
     class Meta:
         model = get_user_model()
         fields = ['email', 'password', 'name']
-        extra_kwargs = {'password': {'write_only': True, 'min_length': 5}}
+        extra_kwargs = {
+            'email': {'validators': []},
+            'password': {'write_only': True, 'min_length': 5},
+        }
+
+    def validate_email(self, email):
+        """Checks no other user has the email, whatever its case."""
+        users = get_user_model().objects.with_email(email)
+        if self.instance is not None:
+            users = users.exclude(pk=self.instance.pk)
+        if users.exists():
+            raise serializers.ValidationError(
+                'user with this email address already exists.')
+
+        return email
 
     def create(self, validated_data):
         """Creates and returns a user"""
@@ -33,11 +91,12 @@ class UserSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         """Updates a user."""
-        password = validated_data.pop('password', )
+        password = validated_data.pop('password', None)
         user = super().update(instance, validated_data)
 
         if password:
             user.set_password(password)
             user.save()
+            revoke_user_tokens(user.pk)
 
         return user
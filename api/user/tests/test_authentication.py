@@ -0,0 +1,141 @@
+"""
+Testing the stateless JWT authentication.
+"""
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from user.authentication import user_states
+
+
+LOGIN_URL = reverse('user:login')
+ORDERS_URL = reverse('product:order-list')
+ORDERS_PRIVATE_URL = reverse('product:orderprivate-list')
+MANAGE_USER_URL = reverse('user:manage-user')
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    """Testing the user built from the token claims."""
+
+    def setUp(self):
+        cache.clear()
+        user_states.clear()
+        self.client = APIClient()
+        self.user = create_user(
+            email='email@mail.com',
+            password='password1234',
+        )
+
+    def login(self, email='email@mail.com', password='password1234'):
+        """Authenticates the client with a token obtained by login."""
+        res = self.client.post(
+            LOGIN_URL, {'email': email, 'password': password}, format='json')
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+
+        return res.data
+
+    def test_token_claims_the_user_fields(self):
+        """Test the access token claims the email and staff flags."""
+        token = AccessToken(self.login()['access'])
+
+        self.assertEqual(token['user_id'], self.user.id)
+        self.assertEqual(token['email'], self.user.email)
+        self.assertFalse(token['is_staff'])
+        self.assertFalse(token['is_superuser'])
+
+    def test_user_is_not_loaded_per_request(self):
+        """Test the user row is read once, then served from the claims."""
+        self.login()
+        self.client.get(ORDERS_URL)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_staff_claim_grants_admin_endpoints(self):
+        """Test a staff user is authorized by the claims."""
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.login()
+
+        res = self.client.get(ORDERS_PRIVATE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_inactive_user_rejected(self):
+        """Test the tokens of a deactivated user are rejected."""
+        self.login()
+        get_user_model().objects.filter(
+            pk=self.user.pk).update(is_active=False)
+        user_states.clear()
+
+        res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_changed_staff_flag_revokes_token(self):
+        """Test a token whose staff claim is stale is rejected."""
+        self.login()
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True)
+        user_states.clear()
+
+        res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes_token(self):
+        """Test changing the password revokes the tokens issued before."""
+        token = AccessToken()
+        token['user_id'] = self.user.id
+        token['email'] = self.user.email
+        token['is_staff'] = token['is_superuser'] = False
+        token['iat'] = token['iat'] - 10
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(
+            self.client.get(ORDERS_URL).status_code, status.HTTP_200_OK)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.patch(MANAGE_USER_URL, {'password': 'password5678'})
+        res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_stored_on_user(self):
+        """Test a revocation made by another process is honoured."""
+        token = AccessToken()
+        token['user_id'] = self.user.id
+        token['email'] = self.user.email
+        token['is_staff'] = token['is_superuser'] = False
+        token['iat'] = token['iat'] - 10
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.client.get(ORDERS_URL)
+
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            tokens_revoked_at=timezone.now())
+        cache.clear()
+        user_states.clear()
+        res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_without_claims_loads_user(self):
+        """Test tokens issued without the claims still authenticate."""
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
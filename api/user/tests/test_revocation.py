@@ -0,0 +1,176 @@
+"""
+Testing the refresh token rotation and revocation.
+"""
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import TokenRevocation
+from user.revocation import BloomFilter, RevocationFilter
+
+
+LOGIN_URL = reverse('user:login')
+REFRESH_URL = reverse('user:refresh')
+LOGOUT_URL = reverse('user:logout')
+
+
+class BloomFilterTests(TestCase):
+    """Bloom filter unit tests."""
+
+    def test_added_items_found(self):
+        """Test every item added is found."""
+        bloom = BloomFilter(1000)
+        items = [f'jti-{i}' for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+
+        self.assertTrue(all(item in bloom for item in items))
+
+    def test_false_positive_rate(self):
+        """Test items never added are rarely found."""
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+
+        found = sum(f'other-{i}' in bloom for i in range(10000))
+
+        self.assertLess(found, 300)
+
+
+@override_settings(REVOCATION_FILTER_SYNC_INTERVAL=0)
+class RevocationFilterTests(TestCase):
+    """Revocation filter tests."""
+
+    def revoke(self, jti, expires_in=timedelta(days=1)):
+        return TokenRevocation.objects.create(
+            jti=jti, expires_at=timezone.now() + expires_in)
+
+    def test_filter_built_from_table(self):
+        """Test the filter is built from the unexpired revocations."""
+        self.revoke('revoked')
+        self.revoke('expired', expires_in=-timedelta(days=1))
+        revocations = RevocationFilter()
+
+        self.assertTrue(revocations.is_revoked('revoked'))
+        self.assertIn('revoked', revocations.bloom)
+        self.assertNotIn('expired', revocations.bloom)
+
+    def test_filter_synced_incrementally(self):
+        """Test revocations of other processes are synced."""
+        revocations = RevocationFilter()
+        self.assertFalse(revocations.is_revoked('revoked'))
+
+        self.revoke('revoked')
+
+        self.assertTrue(revocations.is_revoked('revoked'))
+
+    def test_filter_synced_with_late_commits(self):
+        """Test revocations committed after a later one are synced."""
+        revocations = RevocationFilter()
+        revocations.sync()
+        late = self.revoke('late')
+        TokenRevocation.objects.filter(pk=late.pk).update(
+            revoked_at=revocations.synced_until - timedelta(seconds=30))
+
+        revocations.sync()
+
+        self.assertIn('late', revocations.bloom)
+
+    @override_settings(REVOCATION_FILTER_SYNC_INTERVAL=60)
+    def test_check_of_unrevoked_token_runs_no_query(self):
+        """Test checking a token never revoked is a memory probe."""
+        self.revoke('revoked')
+        revocations = RevocationFilter()
+        revocations.sync()
+
+        with self.assertNumQueries(0):
+            self.assertFalse(revocations.is_revoked('not-revoked'))
+
+    @override_settings(REVOCATION_FILTER_CAPACITY=2)
+    def test_full_filter_rebuilt_larger(self):
+        """Test the filter grows once it holds more than its capacity."""
+        revocations = RevocationFilter()
+        revocations.sync()
+        capacity = revocations.bloom.capacity
+        for i in range(capacity + 1):
+            self.revoke(f'jti-{i}')
+
+        revocations.sync()
+
+        self.assertGreater(revocations.bloom.capacity, capacity)
+        self.assertTrue(revocations.is_revoked('jti-0'))
+
+
+class RefreshRotationTests(TestCase):
+    """Testing the refresh and logout APIs."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        payload = {'email': 'email@mail.com', 'password': 'password1234'}
+        get_user_model().objects.create_user(**payload)
+        self.refresh = self.client.post(
+            LOGIN_URL, payload, format='json').data['refresh']
+
+    def test_refresh_rotates_token(self):
+        """Test refreshing returns a new refresh token and revokes it."""
+        res = self.client.post(
+            REFRESH_URL, {'refresh': self.refresh}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('access', res.data)
+        self.assertNotEqual(res.data['refresh'], self.refresh)
+
+        res = self.client.post(
+            REFRESH_URL, {'refresh': res.data['refresh']}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_refresh_token_used_once(self):
+        """Test a rotated refresh token is rejected."""
+        self.client.post(REFRESH_URL, {'refresh': self.refresh}, format='json')
+
+        res = self.client.post(
+            REFRESH_URL, {'refresh': self.refresh}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_token(self):
+        """Test a refresh token is rejected after logout."""
+        res = self.client.post(
+            LOGOUT_URL, {'refresh': self.refresh}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.post(
+            REFRESH_URL, {'refresh': self.refresh}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_revoked_by_user_rejected(self):
+        """Test a refresh token issued before a revocation is rejected."""
+        get_user_model().objects.update(
+            tokens_revoked_at=timezone.now() + timedelta(seconds=1))
+
+        res = self.client.post(
+            REFRESH_URL, {'refresh': self.refresh}, format='json')
+        logout = self.client.post(
+            LOGOUT_URL, {'refresh': self.refresh}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(logout.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(TokenRevocation.objects.exists())
+
+    def test_refresh_token_of_inactive_user_rejected(self):
+        """Test the refresh token of an inactive user is rejected."""
+        get_user_model().objects.update(is_active=False)
+
+        res = self.client.post(
+            REFRESH_URL, {'refresh': self.refresh}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,14 +1,23 @@
 """
 Testing the user APIs.
 """
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, connection
 from django.urls import reverse
 
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
 
+from core.hashing import HashingUnavailable
+from user.throttling import AuthIPThrottle
+
 
 LOGIN_URL = reverse('user:login')
 CREATE_USER_URL = reverse('user:register')
@@ -28,6 +37,7 @@ class PublicUserApiTest(TestCase):
     """Testing public user APIs."""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
 
     def test_user_login_successful(self):
@@ -112,3 +122,150 @@ class PrivateUserApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(user.name, payload['name'])
         self.assertTrue(user.check_password(payload['password']))
+
+
+class CredentialsThrottleTests(TestCase):
+    """Testing the throttles of login and signup."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    @override_settings(THROTTLE_BUCKETS={
+        'auth_ip': (100, 1), 'auth_email': (2, 0.01)})
+    def test_login_throttled_per_email(self):
+        """Test a burst of logins for an email is throttled."""
+        payload = {'email': 'email@gmail.com', 'password': 'wrong-pass'}
+        for _ in range(2):
+            res = self.client.post(LOGIN_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = self.client.post(LOGIN_URL, payload, format='json')
+        other = self.client.post(
+            LOGIN_URL, dict(payload, email='other@gmail.com'), format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        self.assertEqual(other.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(THROTTLE_BUCKETS={
+        'auth_ip': (1, 0.01), 'auth_email': (100, 1)})
+    def test_signup_throttled_per_ip(self):
+        """Test a burst of signups from an address is throttled."""
+        res = self.client.post(CREATE_USER_URL, {
+            'email': 'one@gmail.com', 'password': 'test-pass123',
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(CREATE_USER_URL, {
+            'email': 'two@gmail.com', 'password': 'test-pass123',
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLE_BUCKETS={
+        'auth_ip': (2, 0.01), 'auth_email': (100, 1)})
+    def test_forwarded_for_does_not_bypass_ip_throttle(self):
+        """Test spoofing X-Forwarded-For does not reset the throttle."""
+        payload = {'email': 'email@gmail.com', 'password': 'wrong-pass'}
+        statuses = [
+            self.client.post(LOGIN_URL, payload, format='json',
+                             HTTP_X_FORWARDED_FOR=f'10.0.0.{i}').status_code
+            for i in range(3)
+        ]
+
+        self.assertEqual(statuses[-1], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLE_BUCKETS={
+        'auth_ip': (5, 0.01), 'auth_email': (100, 1)})
+    def test_parallel_burst_takes_each_token_once(self):
+        """Test parallel requests do not take the same token."""
+        throttle = AuthIPThrottle()
+        request = APIRequestFactory().post(LOGIN_URL)
+        get = LocMemCache.get
+
+        def slow_get(*args, **kwargs):
+            value = get(*args, **kwargs)
+            time.sleep(0.005)
+            return value
+
+        with patch.object(LocMemCache, 'get', slow_get), \
+                ThreadPoolExecutor(max_workers=10) as executor:
+            allowed = list(executor.map(
+                lambda _: AuthIPThrottle().allow_request(request, None),
+                range(20),
+            ))
+
+        self.assertEqual(sum(allowed), 5)
+        self.assertFalse(throttle.allow_request(request, None))
+
+    def test_saturated_hashing_returns_503(self):
+        """Test a login is refused with a 503 when hashing is saturated."""
+        payload = {'email': 'email@gmail.com', 'password': 'test-pass123'}
+        create_user(**payload)
+
+        with patch('core.hashing.get_executor') as get_executor:
+            get_executor.return_value.run.side_effect = HashingUnavailable(
+                'Too many passwords are being hashed.')
+            res = self.client.post(LOGIN_URL, payload, format='json')
+
+        self.assertEqual(
+            res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+
+
+class EmailCaseTests(TestCase):
+    """Testing the case-insensitive email of users."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user(
+            email='Email.Test@gmail.com',
+            password='test-pass123',
+        )
+
+    def test_login_ignores_email_case(self):
+        """Test logging in with the email in another case."""
+        res = self.client.post(LOGIN_URL, {
+            'email': 'email.test@GMAIL.com',
+            'password': 'test-pass123',
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_signup_rejects_email_in_another_case(self):
+        """Test signing up with a taken email in another case fails."""
+        res = self.client.post(CREATE_USER_URL, {
+            'email': 'EMAIL.TEST@gmail.com',
+            'password': 'test-pass123',
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', res.data)
+
+    def test_update_keeps_own_email(self):
+        """Test a user can change the case of their own email."""
+        self.client.force_authenticate(self.user)
+
+        res = self.client.patch(
+            MANAGE_USER_URL, {'email': 'email.test@gmail.com'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_database_rejects_email_in_another_case(self):
+        """Test the unique index rejects emails differing by case."""
+        with self.assertRaises(IntegrityError):
+            create_user(email='EMAIL.TEST@gmail.com', password='test-pass123')
+
+    def test_lookup_uses_lower_email_index(self):
+        """Test the email lookup is planned on the lower(email) index."""
+        users = get_user_model().objects.with_email('EMAIL.TEST@gmail.com')
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+            plan = users.explain()
+            cursor.execute('RESET enable_seqscan')
+
+        self.assertIn('user_email_lower_idx', plan)
+        self.assertEqual(list(users), [self.user])
@@ -0,0 +1,94 @@
+"""
+Token bucket throttles of the user APIs.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttles requests with a token bucket kept in the default cache.
+
+    settings.THROTTLE_BUCKETS maps the scope of the throttle to the
+    capacity of its buckets, the burst of requests allowed, and their
+    rate, the requests per second refilled. A bucket is read and written
+    under a lock held in the cache, so that a burst of parallel requests
+    cannot all take the same token. Requests waiting on the lock longer
+    than lock_wait seconds are throttled.
+    """
+    cache = default_cache
+    scope = None
+    lock_timeout = 1
+    lock_wait = 0.1
+
+    def get_cache_key(self, request, view):
+        """Returns the key of the bucket of a request, None to allow it."""
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def acquire(self, lock_key):
+        """Takes the lock of a bucket, returns whether it was taken."""
+        deadline = time.monotonic() + self.lock_wait
+        while not self.cache.add(lock_key, 1, timeout=self.lock_timeout):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.002)
+
+        return True
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        capacity, rate = settings.THROTTLE_BUCKETS[self.scope]
+        lock_key = f'{key}:lock'
+        if not self.acquire(lock_key):
+            self.wait_time = 1 / rate
+            return False
+        try:
+            now = time.time()
+            tokens, refilled_at = self.cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - refilled_at) * rate)
+            if tokens < 1:
+                self.wait_time = (1 - tokens) / rate
+                return False
+
+            self.cache.set(
+                key, (tokens - 1, now), timeout=math.ceil(capacity / rate))
+            return True
+        finally:
+            self.cache.delete(lock_key)
+
+    def wait(self):
+        return self.wait_time
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """Throttles the credential requests of a client address.
+
+    The address is the one of the connection, X-Forwarded-For is only
+    trusted for the NUM_PROXIES proxies in front of the api.
+    """
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return f'throttle:{self.scope}:{self.get_ident(request)}'
+
+
+class AuthEmailThrottle(TokenBucketThrottle):
+    """Throttles the credential requests for an email."""
+    scope = 'auth_email'
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not email:
+            return None
+
+        digest = hashlib.sha1(str(email).strip().lower().encode()).hexdigest()
+        return f'throttle:{self.scope}:{digest}'
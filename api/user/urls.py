@@ -5,6 +5,8 @@ URL mapping for the user APIs.
 from django.urls import path
 from .views import (
     MyTokenObtainPairView,
+    RotatingTokenRefreshView,
+    LogoutView,
     CreateUserView,
     ManageUserView
 )
@@ -13,6 +15,8 @@ app_name = 'user'
 
 urlpatterns = [
     path('login/', MyTokenObtainPairView.as_view(), name='login'),
+    path('refresh/', RotatingTokenRefreshView.as_view(), name='refresh'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     path('signup/', CreateUserView.as_view(), name='register'),
     path('me/', ManageUserView.as_view(), name='manage-user'),
 ]
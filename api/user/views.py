@@ -4,18 +4,61 @@ Views for user APIs.
 
 from .serializers import (
     MyTokenObtainPairSerializer,
+    RotatingTokenRefreshSerializer,
+    TokenRevokeSerializer,
     UserSerializer
     )
+from .throttling import AuthEmailThrottle, AuthIPThrottle
 
-from rest_framework import generics, authentication, permissions
-from rest_framework_simplejwt.views import TokenObtainPairView
+from core.hashing import HashingUnavailable
 
+from rest_framework import generics, authentication, permissions, status
+from rest_framework.response import Response
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenViewBase
 
-class MyTokenObtainPairView(TokenObtainPairView):
+
+class CredentialsViewMixin:
+    """Throttles the requests of a view hashing passwords.
+
+    Requests are throttled per client address and per email, and a 503
+    is returned when the hashing pool is saturated.
+    """
+    throttle_classes = [AuthIPThrottle, AuthEmailThrottle]
+
+    def handle_exception(self, exc):
+        if isinstance(exc, HashingUnavailable):
+            return Response(
+                {'detail': str(exc)},
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
+
+        return super().handle_exception(exc)
+
+
+class MyTokenObtainPairView(CredentialsViewMixin, TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class RotatingTokenRefreshView(TokenViewBase):
+    """Returns an access token and a new refresh token.
+
+    The refresh token sent is revoked, it can be used only once.
+    """
+    serializer_class = RotatingTokenRefreshSerializer
+
+
+class LogoutView(TokenViewBase):
+    """Revokes a refresh token."""
+    serializer_class = TokenRevokeSerializer
+
+    def post(self, request, *args, **kwargs):
+        super().post(request, *args, **kwargs)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CreateUserView(CredentialsViewMixin, generics.CreateAPIView):
     """Create a new user in the system."""
     serializer_class = UserSerializer
 